@@ -8,7 +8,7 @@ from os import PathLike
 from pathlib import Path
 from typing import Any, TextIO
 
-from platformdirs import user_config_dir
+from platformdirs import user_cache_dir, user_config_dir
 
 AnyPath = str | PathLike[str]
 
@@ -17,6 +17,8 @@ CONFIG_ROOT.mkdir(parents=True, exist_ok=True)
 
 CONFIG_PATH = CONFIG_ROOT / "config.json"
 
+CACHE_ROOT = Path(user_cache_dir("numidium", appauthor=False))
+
 
 @dataclass
 class ConfigBase:
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Hashable, Iterable
 
 from numidium.logger import logger
+from numidium.tes3.esp import Plugin, load_many
+from numidium.tes3.esp.object import TES3Object, wrapper_type
+from numidium.tes3.esp.records import normalize_key, record_key
 from numidium.tes3.ini import MorrowindIni
 
-__all__ = ["MorrowindInstall"]
+__all__ = ["LoadOrder", "MorrowindInstall"]
+
+RecordKey = tuple[type[TES3Object], Hashable]
 
 
 # TODO: Add unit tests.
@@ -25,6 +31,21 @@ class MorrowindInstall:
             logger.error("Morrowind.ini does not exist: %s", self.ini_path)
             raise e
 
+    def load_order_paths(self) -> list[Path]:
+        """Get the paths of the active plugins, in the order the game loads them.
+
+        Masters are loaded before plugins, and files of the same kind by their modification time.
+        """
+        paths = []
+        for name in self.ini.game_files:
+            path = self.data_files_path / name
+            if path.exists():
+                paths.append(path)
+            else:
+                logger.warning("Active plugin does not exist: {}", path)
+        paths.sort(key=lambda p: (p.suffix.lower() != ".esm", p.stat().st_mtime))
+        return paths
+
     @property
     def exe_path(self) -> Path:
         return self.workspace / "Morrowind.exe"
@@ -44,3 +65,89 @@ class MorrowindInstall:
     @property
     def screenshots_path(self) -> Path:
         return self.workspace / "Screenshots"
+
+
+class LoadOrder:
+    """The merged view of a list of plugins, as seen by the game.
+
+    Records are identified by their type and key (see `record_key`), and only the record from the
+    last plugin to provide a given key is kept.
+
+    Attributes
+    ----------
+    paths : list[Path]
+        The paths of the merged plugins, in load order.
+    plugins : list[Plugin]
+        The merged plugins, in load order.
+    records : dict[RecordKey, TES3Object]
+        The winning record for each type and key.
+    sources : dict[RecordKey, list[int]]
+        The indices of every plugin that provided a given record, in load order.
+    """
+
+    paths: list[Path]
+    plugins: list[Plugin]
+    records: dict[RecordKey, TES3Object]
+    sources: dict[RecordKey, list[int]]
+
+    _types: dict[type[TES3Object], dict[Hashable, TES3Object]]
+
+    def __init__(self) -> None:
+        self.paths = []
+        self.plugins = []
+        self.records = {}
+        self.sources = {}
+        self._types = {}
+
+    @staticmethod
+    def from_install(install: MorrowindInstall, workers: int | None = None, lazy: bool = False) -> LoadOrder:
+        """Build the merged view of all active plugins of the given install."""
+        load_order = LoadOrder()
+        load_order.extend(install.load_order_paths(), workers, lazy)
+        return load_order
+
+    def append(self, path: Path, plugin: Plugin) -> None:
+        """Merge a plugin on top of the current load order."""
+        index = len(self.plugins)
+        self.paths.append(path)
+        self.plugins.append(plugin)
+
+        for obj in plugin.objects:
+            key = record_key(obj)
+            if key is None:
+                continue
+            ty = wrapper_type(obj)
+            record_id = (ty, key)
+            self.records[record_id] = obj
+            self.sources.setdefault(record_id, []).append(index)
+            self._types.setdefault(ty, {})[key] = obj
+
+    def extend(self, paths: Iterable[Path], workers: int | None = None, lazy: bool = False) -> None:
+        """Load the given plugins, on `workers` threads if given, and merge each of them in order once it is ready.
+
+        When `lazy` is set the plugins are opened lazily, so that their records keep views of their
+        original bytes. Plugins that fail to load are logged and skipped.
+        """
+        for result in load_many(paths, workers, lazy):
+            if result.plugin is None:
+                logger.error("Failed to load plugin: {} ({})", result.path, result.error)
+            else:
+                self.append(Path(result.path), result.plugin)
+
+    def by_type(self, ty: type[TES3Object]) -> dict[Hashable, TES3Object]:
+        """Get the winning records of the given type, by key."""
+        return self._types.get(ty, {})
+
+    def get(self, ty: type[TES3Object], key: Hashable) -> TES3Object | None:
+        """Get the winning record of the given type and key."""
+        return self.records.get((ty, normalize_key(key)))
+
+    def source(self, ty: type[TES3Object], key: Hashable) -> Path | None:
+        """Get the path of the plugin that supplied the winning record of the given type and key."""
+        if sources := self.sources.get((ty, normalize_key(key))):
+            return self.paths[sources[-1]]
+        return None
+
+    def overridden(self, ty: type[TES3Object], key: Hashable) -> list[Path]:
+        """Get the paths of the plugins whose version of a record was overridden, in load order."""
+        return [self.paths[i] for i in self.sources.get((ty, normalize_key(key)), [])[:-1]]
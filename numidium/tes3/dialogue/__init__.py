@@ -0,0 +1,12 @@
+from .filters import *
+from .index import *
+
+__all__ = [
+    "CompiledInfo",
+    "DialogueIndex",
+    "FilterEvaluator",
+    "GameState",
+    "Speaker",
+    "Topic",
+    "compile_info",
+]
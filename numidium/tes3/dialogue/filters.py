@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import operator
+from typing import Callable, Iterable, NamedTuple
+
+from numidium.tes3.esp import (
+    FilterComparison,
+    FilterFunction,
+    FilterType,
+    Info,
+    Npc,
+    Sex,
+)
+
+from .index import DialogueIndex
+
+__all__ = ["CompiledInfo", "FilterEvaluator", "GameState", "Speaker", "compile_info"]
+
+StateCheck = Callable[["GameState"], bool]
+SpeakerCheck = Callable[["GameState", "Speaker"], bool]
+
+COMPARISONS: dict[FilterComparison, Callable[[float, float], bool]] = {
+    FilterComparison.Equal: operator.eq,
+    FilterComparison.NotEqual: operator.ne,
+    FilterComparison.Greater: operator.gt,
+    FilterComparison.GreaterEqual: operator.ge,
+    FilterComparison.Less: operator.lt,
+    FilterComparison.LessEqual: operator.le,
+}
+
+
+class Speaker(NamedTuple):
+    """The speaker of a conversation. Ids are lowercase."""
+
+    id: str
+    race: str | None = None
+    class_: str | None = None
+    faction: str | None = None
+    rank: int = -1
+    sex: Sex = Sex.Male
+    disposition: int = 0
+    cell: str | None = None
+
+    @staticmethod
+    def from_npc(npc: Npc, cell: str | None = None) -> Speaker:
+        """Describe an NPC as a speaker, optionally placed in the given cell."""
+        data = npc.data
+        return Speaker(
+            id=npc.id.lower(),
+            race=npc.race and npc.race.lower(),
+            class_=npc.class_ and npc.class_.lower(),
+            faction=npc.faction and npc.faction.lower(),
+            rank=-1 if data is None or not npc.faction else data.rank,
+            sex=Sex.Female if (npc.npc_flags or 0) & 0x01 else Sex.Male,
+            disposition=0 if data is None else data.disposition,
+            cell=cell and cell.lower(),
+        )
+
+
+class GameState:
+    """A simulated game state that dialogue filters are evaluated against. Ids are lowercase.
+
+    Attributes
+    ----------
+    globals : dict[str, float]
+        The value of each global variable.
+    journal : dict[str, int]
+        The current index of each journal (quest).
+    items : dict[str, int]
+        The number of each item carried by the player.
+    dead : dict[str, int]
+        The number of dead references of each object.
+    locals : dict[str, dict[str, float]]
+        The local variables of each speaker's script, by speaker id.
+    factions : dict[str, int]
+        The rank of the player in each faction they are a member of.
+    functions : dict[FilterFunction, float]
+        The value of function filters, e.g. `PcLevel`. Functions comparing the speaker with the
+        player use the speaker and the `player` fields instead.
+    player : Speaker
+        The player, as a speaker.
+    """
+
+    globals: dict[str, float]
+    journal: dict[str, int]
+    items: dict[str, int]
+    dead: dict[str, int]
+    locals: dict[str, dict[str, float]]
+    factions: dict[str, int]
+    functions: dict[FilterFunction, float]
+    player: Speaker
+
+    def __init__(self) -> None:
+        self.globals = {}
+        self.journal = {}
+        self.items = {}
+        self.dead = {}
+        self.locals = {}
+        self.factions = {}
+        self.functions = {}
+        self.player = Speaker("player")
+
+
+class CompiledInfo(NamedTuple):
+    """A response with its conditions compiled into predicates.
+
+    Conditions that only depend on the game state are kept apart from those that depend on the
+    speaker, so that they are evaluated once per state rather than once per speaker.
+    """
+
+    info: Info
+    speaker_id: str | None
+    state_checks: tuple[StateCheck, ...]
+    speaker_checks: tuple[SpeakerCheck, ...]
+
+
+def compile_info(info: Info) -> CompiledInfo:
+    """Compile the speaker conditions and filters of a response into predicates."""
+    state_checks: list[StateCheck] = []
+    speaker_checks: list[SpeakerCheck] = []
+
+    # `speaker_rank` holds the required race of the speaker
+    required = {"race": info.speaker_rank, "class_": info.speaker_class, "faction": info.speaker_faction}
+    for field, value in required.items():
+        if value:
+            speaker_checks.append(_speaker_equals(field, value.lower()))
+    if info.speaker_cell:
+        speaker_checks.append(_speaker_in_cell(info.speaker_cell.lower()))
+
+    if (data := info.data) is not None:
+        sex, disposition = data.speaker_sex, data.disposition
+        speaker_rank, player_rank = data.speaker_rank, data.player_rank
+        if sex != Sex.Any:
+            speaker_checks.append(lambda state, speaker: speaker.sex == sex)
+        if disposition > 0:
+            speaker_checks.append(lambda state, speaker: speaker.disposition >= disposition)
+        if speaker_rank >= 0:
+            speaker_checks.append(lambda state, speaker: speaker.rank >= speaker_rank)
+        if player_rank >= 0 and not info.player_faction:
+            speaker_checks.append(_player_rank_in_speaker_faction(player_rank))
+
+    if info.player_faction:
+        faction = info.player_faction.lower()
+        min_rank = 0 if info.data is None else max(info.data.player_rank, 0)
+        state_checks.append(lambda state: state.factions.get(faction, -1) >= min_rank)
+
+    for f in info.filters:
+        check = _compile_filter(f.kind, f.function, f.comparison, f.id.lower(), f.value or 0)
+        if isinstance(check, _StateCheck):
+            state_checks.append(check)
+        elif check is not None:
+            speaker_checks.append(check)
+
+    speaker_id = info.speaker_id.lower() if info.speaker_id else None
+    return CompiledInfo(info, speaker_id, tuple(state_checks), tuple(speaker_checks))
+
+
+class FilterEvaluator:
+    """Choose the responses a speaker gives, by evaluating compiled filters.
+
+    Responses are compiled once per topic, on first use.
+
+    Attributes
+    ----------
+    index : DialogueIndex
+        The dialogue to evaluate.
+    """
+
+    index: DialogueIndex
+
+    _compiled: dict[str, list[CompiledInfo]]
+
+    def __init__(self, index: DialogueIndex) -> None:
+        self.index = index
+        self._compiled = {}
+
+    def compiled(self, topic_id: str) -> list[CompiledInfo]:
+        """Get the compiled responses of a topic, in order."""
+        key = topic_id.lower()
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = [compile_info(info) for info in self.index.topic(key)]
+        return compiled
+
+    def evaluate(self, topic_id: str, speaker: Speaker, state: GameState) -> Info | None:
+        """Get the first response of a topic whose conditions match, or `None`."""
+        return self._evaluate(self.compiled(topic_id), speaker, state, {})
+
+    def coverage(
+        self,
+        speakers: Iterable[Speaker],
+        state: GameState,
+        topics: Iterable[str] | None = None,
+    ) -> dict[tuple[str, str], Info | None]:
+        """Evaluate every topic for every speaker, by `(topic id, speaker id)`.
+
+        The conditions of each response that only depend on the state are evaluated at most once.
+        """
+        topic_ids = list(self.index.topics if topics is None else map(str.lower, topics))
+        compiled = [(topic_id, self.compiled(topic_id)) for topic_id in topic_ids]
+        state_results: dict[int, bool] = {}
+        return {
+            (topic_id, speaker.id): self._evaluate(infos, speaker, state, state_results)
+            for speaker in speakers
+            for topic_id, infos in compiled
+        }  # fmt: skip
+
+    @staticmethod
+    def _evaluate(
+        infos: list[CompiledInfo],
+        speaker: Speaker,
+        state: GameState,
+        state_results: dict[int, bool],
+    ) -> Info | None:
+        for compiled in infos:
+            if compiled.speaker_id is not None and compiled.speaker_id != speaker.id:
+                continue
+            key = id(compiled)
+            passed = state_results.get(key)
+            if passed is None:
+                passed = state_results[key] = all(check(state) for check in compiled.state_checks)
+            if passed and all(check(state, speaker) for check in compiled.speaker_checks):
+                return compiled.info
+        return None
+
+
+class _StateCheck:
+    """Marks a compiled filter as only depending on the game state."""
+
+    __slots__ = ("check",)
+
+    def __init__(self, check: StateCheck) -> None:
+        self.check = check
+
+    def __call__(self, state: GameState) -> bool:
+        return self.check(state)
+
+
+def _compile_filter(
+    kind: FilterType,
+    function: FilterFunction,
+    comparison: FilterComparison,
+    id: str,
+    value: float,
+) -> _StateCheck | SpeakerCheck | None:
+    """Compile a filter into a predicate, or `None` if it always passes."""
+    compare = COMPARISONS[comparison]
+
+    if kind == FilterType.Global:
+        return _StateCheck(lambda state: compare(state.globals.get(id, 0), value))
+    if kind == FilterType.Journal:
+        return _StateCheck(lambda state: compare(state.journal.get(id, 0), value))
+    if kind == FilterType.Item:
+        return _StateCheck(lambda state: compare(state.items.get(id, 0), value))
+    if kind == FilterType.Dead:
+        return _StateCheck(lambda state: compare(state.dead.get(id, 0), value))
+    if kind == FilterType.Local:
+        return lambda state, speaker: id in (v := state.locals.get(speaker.id, {})) and compare(v[id], value)
+    if kind == FilterType.NotLocal:
+        return lambda state, speaker: not (id in (v := state.locals.get(speaker.id, {})) and compare(v[id], value))
+    if kind == FilterType.NotId:
+        return lambda state, speaker: speaker.id != id
+    if kind == FilterType.NotFaction:
+        return lambda state, speaker: speaker.faction != id
+    if kind == FilterType.NotClass:
+        return lambda state, speaker: speaker.class_ != id
+    if kind == FilterType.NotRace:
+        return lambda state, speaker: speaker.race != id
+    if kind == FilterType.NotCell:
+        return lambda state, speaker: not (speaker.cell or "").startswith(id)
+    if kind == FilterType.Function:
+        if function == FilterFunction.SameSex:
+            return lambda state, speaker: compare(speaker.sex == state.player.sex, value)
+        if function == FilterFunction.SameRace:
+            return lambda state, speaker: compare(speaker.race == state.player.race, value)
+        if function == FilterFunction.SameFaction:
+            return lambda state, speaker: compare(speaker.faction in state.factions, value)
+        if function == FilterFunction.PcSex:
+            return _StateCheck(lambda state: compare(state.player.sex.value, value))
+        return _StateCheck(lambda state: compare(state.functions.get(function, 0), value))
+    return None
+
+
+def _speaker_equals(field: str, value: str) -> SpeakerCheck:
+    index = Speaker._fields.index(field)
+    return lambda state, speaker: speaker[index] == value
+
+
+def _speaker_in_cell(cell: str) -> SpeakerCheck:
+    return lambda state, speaker: (speaker.cell or "").startswith(cell)
+
+
+def _player_rank_in_speaker_faction(rank: int) -> SpeakerCheck:
+    return lambda state, speaker: speaker.faction is not None and state.factions.get(speaker.faction, -1) >= rank
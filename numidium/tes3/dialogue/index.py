@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, cast
+
+from numidium.logger import logger
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Dialogue, Info, Plugin
+
+__all__ = ["DialogueIndex", "Topic"]
+
+
+class Topic:
+    """The merged responses of a dialogue topic, in the order the game checks them.
+
+    Responses are kept as a doubly linked list of info ids, so that inserting, moving and removing
+    a response are all constant-time.
+
+    Attributes
+    ----------
+    dialogue : Dialogue
+        The winning dialogue record of the topic.
+    infos : dict[str, Info]
+        The winning version of each response, by info id.
+    """
+
+    dialogue: Dialogue
+    infos: dict[str, Info]
+
+    _prev: dict[str, str | None]
+    _next: dict[str, str | None]
+    _head: str | None
+    _tail: str | None
+    _order: list[Info] | None
+
+    def __init__(self, dialogue: Dialogue) -> None:
+        self.dialogue = dialogue
+        self.infos = {}
+        self._prev = {}
+        self._next = {}
+        self._head = None
+        self._tail = None
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self.infos)
+
+    def __iter__(self) -> Iterator[Info]:
+        if self._order is None:
+            order = []
+            info_id = self._head
+            while info_id is not None:
+                order.append(self.infos[info_id])
+                info_id = self._next[info_id]
+            self._order = order
+        return iter(self._order)
+
+    def insert(self, info: Info) -> None:
+        """Merge a response into the topic.
+
+        A new response is placed after its previous response, or before its next response if only
+        that one is known, or at the end of the topic otherwise. An empty previous id places it at
+        the start. A response that already exists is replaced, and only moved if its previous id
+        changed. Deleted responses are removed.
+        """
+        info_id = info.info_id
+        if info.deleted is not None:
+            self.remove(info_id)
+            return
+
+        prev_id, next_id = info.prev_id or None, info.next_id or None
+        self._order = None
+        if info_id in self.infos:
+            self.infos[info_id] = info
+            if self._prev[info_id] == prev_id:
+                return
+            self._unlink(info_id)
+        self.infos[info_id] = info
+
+        if prev_id is None:
+            self._link(info_id, None, self._head)
+        elif prev_id in self.infos:
+            self._link(info_id, prev_id, self._next[prev_id])
+        elif next_id in self.infos:
+            self._link(info_id, self._prev[next_id], next_id)
+        else:
+            self._link(info_id, self._tail, None)
+
+    def remove(self, info_id: str) -> None:
+        """Remove a response from the topic, if it exists."""
+        if info_id in self.infos:
+            self._unlink(info_id)
+            del self.infos[info_id]
+            self._order = None
+
+    def _link(self, info_id: str, prev_id: str | None, next_id: str | None) -> None:
+        self._prev[info_id] = prev_id
+        self._next[info_id] = next_id
+        if prev_id is None:
+            self._head = info_id
+        else:
+            self._next[prev_id] = info_id
+        if next_id is None:
+            self._tail = info_id
+        else:
+            self._prev[next_id] = info_id
+
+    def _unlink(self, info_id: str) -> None:
+        prev_id = self._prev.pop(info_id)
+        next_id = self._next.pop(info_id)
+        if prev_id is None:
+            self._head = next_id
+        else:
+            self._next[prev_id] = next_id
+        if next_id is None:
+            self._tail = prev_id
+        else:
+            self._prev[next_id] = prev_id
+
+
+class DialogueIndex:
+    """The merged dialogue of a load order, grouped by topic.
+
+    Each response belongs to the topic of the dialogue record that precedes it in its plugin.
+    Merging is linear in the number of responses, as every response is linked into its topic in
+    constant time.
+
+    Attributes
+    ----------
+    paths : list[Path]
+        The paths of the merged plugins, in load order.
+    topics : dict[str, Topic]
+        The topics, by lowercased dialogue id.
+    """
+
+    paths: list[Path]
+    topics: dict[str, Topic]
+
+    _topic_keys: dict[str, str]
+    _speakers: dict[str, list[tuple[Dialogue, Info]]] | None
+
+    def __init__(self) -> None:
+        self.paths = []
+        self.topics = {}
+        self._topic_keys = {}
+        self._speakers = None
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder) -> DialogueIndex:
+        """Build the merged dialogue of a load order."""
+        index = DialogueIndex()
+        for path, plugin in zip(load_order.paths, load_order.plugins):
+            index.append(path, plugin)
+        return index
+
+    def append(self, path: Path, plugin: Plugin) -> None:
+        """Merge the dialogue of a plugin on top of the current index."""
+        self.paths.append(path)
+        self._speakers = None
+
+        topic, has_topic = None, False
+        for obj in plugin.by_types(Dialogue, Info):
+            if isinstance(obj, Dialogue):
+                topic, has_topic = self._merge_dialogue(obj), True
+            elif not has_topic:
+                logger.warning("Dialogue response without a topic: {} ({})", path, obj.info_id)
+            elif topic is not None:  # otherwise the topic was deleted
+                topic.insert(cast(Info, obj))
+                self._topic_keys[obj.info_id] = topic.dialogue.id.lower()
+
+    def topic(self, dialogue_id: str) -> list[Info]:
+        """Get the responses of a topic, in order."""
+        topic = self.topics.get(dialogue_id.lower())
+        return [] if topic is None else list(topic)
+
+    def topic_of(self, info_id: str) -> Topic | None:
+        """Get the topic a response belongs to."""
+        key = self._topic_keys.get(info_id)
+        topic = None if key is None else self.topics.get(key)
+        return topic if topic is not None and info_id in topic.infos else None
+
+    def get(self, info_id: str) -> Info | None:
+        """Get the winning version of a response."""
+        topic = self.topic_of(info_id)
+        return None if topic is None else topic.infos[info_id]
+
+    def by_speaker(self, speaker_id: str) -> list[tuple[Dialogue, Info]]:
+        """Get the responses restricted to a speaker, with their topics, in order.
+
+        Responses that any speaker may give are not included.
+        """
+        if self._speakers is None:
+            speakers: dict[str, list[tuple[Dialogue, Info]]] = {}
+            for topic in self.topics.values():
+                for info in topic:
+                    if info.speaker_id:
+                        speakers.setdefault(info.speaker_id.lower(), []).append((topic.dialogue, info))
+            self._speakers = speakers
+        return self._speakers.get(speaker_id.lower(), [])
+
+    def _merge_dialogue(self, dialogue: Dialogue) -> Topic | None:
+        key = dialogue.id.lower()
+        if dialogue.deleted is not None:
+            self.topics.pop(key, None)
+            return None
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = Topic(dialogue)
+        else:
+            topic.dialogue = dialogue
+        return topic
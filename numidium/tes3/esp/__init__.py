@@ -9,6 +9,7 @@ from .birthsign import *
 from .bodypart import *
 from .book import *
 from .cell import *
+from .changes import *
 from .class_ import *
 from .clothing import *
 from .container import *
@@ -38,6 +39,7 @@ from .pathgrid import *
 from .plugin import *
 from .probe import *
 from .race import *
+from .reader import *
 from .reference import *
 from .region import *
 from .repairtool import *
@@ -48,6 +50,7 @@ from .soundgen import *
 from .spell import *
 from .startscript import *
 from .static_ import *
+from .table import *
 from .weapon import *
 
 __all__ = [
@@ -80,6 +83,7 @@ __all__ = [
     "BookData",
     "Cell",
     "CellData",
+    "CellReferences",
     "Class",
     "ClassData",
     "Clothing",
@@ -105,6 +109,7 @@ __all__ = [
     "FactionData",
     "FactionReaction",
     "FactionRequirement",
+    "FieldChange",
     "FileType",
     "Filter",
     "FilterComparison",
@@ -117,6 +122,7 @@ __all__ = [
     "GlobalType",
     "GlobalVariable",
     "Header",
+    "HeaderResult",
     "Info",
     "InfoData",
     "Ingredient",
@@ -127,6 +133,7 @@ __all__ = [
     "LevelledItem",
     "Light",
     "LightData",
+    "LoadResult",
     "Lockpick",
     "LockpickData",
     "MagicEffect",
@@ -140,10 +147,13 @@ __all__ = [
     "PathGridData",
     "PathGridPoint",
     "Plugin",
+    "PluginDiff",
     "Probe",
     "ProbeData",
     "Race",
     "RaceData",
+    "RecordChange",
+    "RecordTable",
     "Reference",
     "Region",
     "RepairTool",
@@ -175,4 +185,9 @@ __all__ = [
     "WeaponType",
     "WeatherChances",
     "WorldMapData",
+    "diff",
+    "iter_records",
+    "load_many",
+    "read_header",
+    "read_headers",
 ]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Hashable
+
+from .reader import RecordHeaders
+
+CacheKeys = dict[bytes, dict[Hashable, int]]
+
+CACHE_VERSION = 2
+
+
+def file_hash(path: str | Path) -> bytes:
+    """Compute the content hash of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class PluginCache:
+    """A persistent on-disk cache of the record tables and ID indexes of plugins.
+
+    Record tables are stored as columns, together with the positions of each record type, so that
+    restoring them does not create an object per record. ID indexes are appended to the entry of
+    their plugin as they are built, without rewriting the rest of the entry. Decoded records are
+    not cached, as native records can only be created by decoding their bytes.
+
+    Entries that cannot be read, e.g. because they are corrupt or were written by another version,
+    count as misses. Entries are invalidated when the size or modification time of their plugin changes, or when
+    its content hash changes if `verify_hash` is set. Once the cache grows beyond `max_size` bytes
+    the least recently used entries are evicted.
+
+    Attributes
+    ----------
+    root : Path
+        The directory the cache entries are stored in.
+    max_size : int
+        The maximum total size of the cache entries, in bytes.
+    verify_hash : bool
+        Also compare the content hash of plugins before using their entries.
+    """
+
+    root: Path
+    max_size: int
+    verify_hash: bool
+
+    def __init__(self, root: str | Path, max_size: int = 256 * 1024 * 1024, verify_hash: bool = False) -> None:
+        self.root = Path(root)
+        self.max_size = max_size
+        self.verify_hash = verify_hash
+
+    def load(self, path: str | Path) -> tuple[RecordHeaders, CacheKeys] | None:
+        """Load the record table and ID indexes of a plugin, or `None` if there is no valid entry."""
+        entry_path = self._entry_path(path)
+        try:
+            with open(entry_path, "rb") as f:
+                entry = pickle.load(f)
+                if entry["version"] != CACHE_VERSION or entry["stamp"] != self._stamp(path):
+                    return None
+                tags, sizes, flags1, flags2, offsets = entry["records"]
+                records = RecordHeaders(tags, sizes, flags1, flags2, offsets, entry["positions"])
+                keys: CacheKeys = {}
+                while True:
+                    try:
+                        keys.update(pickle.load(f))
+                    except Exception:  # the end of the entry, or an index that was only partly written
+                        break
+        except Exception:  # a missing, corrupt or incompatible entry
+            return None
+
+        os.utime(entry_path)  # mark as recently used
+        return records, keys
+
+    def save(self, path: str | Path, records: RecordHeaders, keys: CacheKeys) -> None:
+        """Save the record table and ID indexes of a plugin, evicting old entries if needed."""
+        entry = {
+            "version": CACHE_VERSION,
+            "stamp": self._stamp(path),
+            "records": (records.tags, records.sizes, records.flags1, records.flags2, records.offsets),
+            "positions": records.positions(),
+        }
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(path)
+        temp_path = entry_path.with_suffix(".tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                if keys:
+                    pickle.dump(keys, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError):
+            temp_path.unlink(missing_ok=True)
+            return
+        os.replace(temp_path, entry_path)
+
+        self.evict()
+
+    def save_keys(self, path: str | Path, keys: CacheKeys) -> None:
+        """Add ID indexes to the existing entry of a plugin."""
+        entry_path = self._entry_path(path)
+        if not entry_path.exists():
+            return
+        try:
+            data = pickle.dumps(keys, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError):
+            return
+        with open(entry_path, "ab") as f:
+            f.write(data)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits within `max_size`."""
+        entries = [(p, p.stat()) for p in self.root.glob("*.cache")]
+        entries.sort(key=lambda e: e[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for entry_path, stat in entries:
+            if total <= self.max_size:
+                break
+            entry_path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        for entry_path in self.root.glob("*.cache"):
+            entry_path.unlink(missing_ok=True)
+
+    def _entry_path(self, path: str | Path) -> Path:
+        name = hashlib.blake2b(os.fsencode(Path(path).resolve()), digest_size=16).hexdigest()
+        return self.root / f"{name}.cache"
+
+    def _stamp(self, path: str | Path) -> tuple[Any, ...]:
+        """Get the values that must match for an entry to be valid."""
+        stat = os.stat(path)
+        if self.verify_hash:
+            return stat.st_size, stat.st_mtime_ns, file_hash(path)
+        return stat.st_size, stat.st_mtime_ns
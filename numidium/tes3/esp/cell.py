@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+import struct
+import sys
+from array import array
+from types import ModuleType
+from typing import Any, Iterator, Mapping
+
 from ..typing import *
 from .object import TES3Object
+from .reader import decode_string, iter_subrecords
 from .reference import Reference
 
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Cell(TES3Object):
+    __slots__ = ("_references",)
+
     flags1: u32
     flags2: u32
     name: str | None
@@ -14,9 +29,37 @@ class Cell(TES3Object):
     map_color: list[u8] | None  # size=4
     water_height: f32 | None
     atmosphere_data: AtmosphereData | None
-    references: dict[tuple[u32, u32], Reference]
+    references: CellReferences
     deleted: u32 | None
 
+    _references: CellReferences
+
+    @property  # type: ignore[no-redef]
+    def references(self) -> CellReferences:
+        """The references of the cell, kept in compact columns.
+
+        The columns are parsed from the original bytes of the cell when they are available, and
+        built once per cell rather than on every access.
+        """
+        try:
+            return self._references
+        except AttributeError:
+            pass
+        if self._raw is None:
+            self._references = CellReferences.from_native(self._wrapped)
+        else:
+            self._references = CellReferences.parse(self._wrapped, memoryview(self._raw))
+        return self._references
+
+    @references.setter
+    def references(self, value: Mapping[tuple[int, int], Reference]) -> None:
+        self._wrapped.references = {  # type: ignore[attr-defined]
+            key: ref._wrapped if isinstance(ref, TES3Object) else ref
+            for key, ref in value.items()
+        }  # fmt: skip
+        self._references = CellReferences.from_native(self._wrapped)
+        self._raw = None
+
 
 class CellData(TES3Object):
     flags: u32
@@ -28,3 +71,159 @@ class AtmosphereData(TES3Object):
     sunlight_color: list[u8]  # size=4
     fog_color: list[u8]  # size=4
     fog_density: f32
+
+
+class CellReferences(Mapping[tuple[int, int], Reference]):
+    """The references of a cell, keyed by `(mast_index, refr_index)` and stored as compact columns.
+
+    The master index, reference index, id, placement and state of each reference are available as
+    columns without decoding the reference. `Reference` objects are only created as they are
+    accessed, and the references of the cell are decoded at most once.
+
+    `translations` and `rotations` are NumPy arrays of shape `(n, 3)` if NumPy is available, and
+    lists of arrays otherwise.
+
+    Attributes
+    ----------
+    mast_indices : array[int]
+        The master index of each reference.
+    refr_indices : array[int]
+        The reference index of each reference.
+    ids : list[str]
+        The (interned) object id of each reference.
+    deleted : bytearray
+        Whether each reference is deleted.
+    temporary : bytearray
+        Whether each reference is temporary.
+    moved_cells : dict[int, tuple[int, int] | str]
+        The grid of the exterior cell, or the name of the interior cell, that each moved reference
+        was moved to, by row.
+    """
+
+    mast_indices: array[int]
+    refr_indices: array[int]
+    ids: list[str]
+    deleted: bytearray
+    temporary: bytearray
+    moved_cells: dict[int, tuple[int, int] | str]
+
+    _placements: array[float]
+    _rows: dict[int, int]
+    _cell: Any
+    _native: dict[tuple[int, int], Any] | None
+    _objects: dict[int, Reference]
+
+    def __init__(self, cell: Any) -> None:
+        self.mast_indices = array("I")
+        self.refr_indices = array("I")
+        self.ids = []
+        self.deleted = bytearray()
+        self.temporary = bytearray()
+        self.moved_cells = {}
+        self._placements = array("f")
+        self._rows = {}
+        self._cell = cell
+        self._native = None
+        self._objects = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return zip(self.mast_indices, self.refr_indices)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and _pack(*key) in self._rows
+
+    def __getitem__(self, key: tuple[int, int]) -> Reference:
+        try:
+            row = self._rows[_pack(*key)]
+        except KeyError:
+            raise KeyError(key) from None
+        return self.at(row)
+
+    @staticmethod
+    def parse(cell: Any, raw: memoryview) -> CellReferences:
+        """Parse the references of a native cell from its original bytes."""
+        references = CellReferences(cell)
+        row, temporary, moved = -1, False, None
+        for tag, view in iter_subrecords(raw):
+            if tag == b"FRMR":
+                value = struct.unpack_from("<I", view)[0]
+                row = references._append(value >> 24, value & 0xFFFFFF, "", temporary, moved)
+                moved = None
+            elif tag == b"NAM0":
+                temporary = True  # all following references are temporary
+            elif tag == b"MVRF":
+                moved = ()
+            elif tag == b"CNDT" and moved is not None:
+                moved = struct.unpack_from("<ii", view)
+            elif tag == b"CNAM" and moved is not None:
+                moved = decode_string(view)  # moved into an interior cell
+            elif row < 0:
+                continue  # a subrecord of the cell itself
+            elif tag == b"NAME":
+                references.ids[row] = sys.intern(decode_string(view))
+            elif tag == b"DATA":
+                references._placements[row * 6 : row * 6 + 6] = array("f", struct.unpack_from("<6f", view))
+            elif tag == b"DELE":
+                references.deleted[row] = 1
+        return references
+
+    @staticmethod
+    def from_native(cell: Any) -> CellReferences:
+        """Build the columns from the decoded references of a native cell."""
+        native = cell.references
+        references = CellReferences(cell)
+        for ref in native.values():
+            row = references._append(ref.mast_index, ref.refr_index, ref.id, ref.temporary, ref.moved_cell)
+            references._placements[row * 6 : row * 6 + 6] = array("f", [*ref.translation, *ref.rotation])
+            references.deleted[row] = ref.deleted is not None
+        references._native = native
+        return references
+
+    @property
+    def translations(self) -> Any:
+        return self._column(0)
+
+    @property
+    def rotations(self) -> Any:
+        return self._column(3)
+
+    def row(self, key: tuple[int, int]) -> int:
+        """Get the row of the reference with the given key."""
+        return self._rows[_pack(*key)]
+
+    def at(self, row: int) -> Reference:
+        """Get the reference at the given row, decoding the references of the cell if needed."""
+        obj = self._objects.get(row)
+        if obj is None:
+            if self._native is None:
+                self._native = self._cell.references
+            key = (self.mast_indices[row], self.refr_indices[row])
+            obj = self._objects[row] = TES3Object.wrap(self._native[key])  # type: ignore[assignment]
+        return obj  # type: ignore[return-value]
+
+    def _append(self, mast_index: int, refr_index: int, id: str, temporary: bool, moved: Any) -> int:
+        row = len(self.ids)
+        self.mast_indices.append(mast_index)
+        self.refr_indices.append(refr_index)
+        self.ids.append(sys.intern(id))
+        self.deleted.append(0)
+        self.temporary.append(temporary)
+        self._placements.extend((0.0,) * 6)
+        if moved:
+            self.moved_cells[row] = moved if isinstance(moved, str) else (moved[0], moved[1])
+        self._rows[_pack(mast_index, refr_index)] = row
+        return row
+
+    def _column(self, start: int) -> Any:
+        """Get three columns of the placements, starting at the given column."""
+        if np is not None:
+            return np.frombuffer(self._placements, dtype=np.float32).reshape(-1, 6)[:, start : start + 3]
+        return [self._placements[i : i + 3] for i in range(start, len(self._placements), 6)]
+
+
+def _pack(mast_index: int, refr_index: int) -> int:
+    """Pack a reference key into a single integer, as stored in the FRMR subrecord."""
+    return mast_index << 24 | refr_index
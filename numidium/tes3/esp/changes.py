@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Hashable, NamedTuple
+
+from .cell import Cell
+from .compare import FieldChange, field_changes
+from .object import TES3Object, wrapper_type
+from .plugin import Plugin
+from .records import record_key
+from .reference import Reference
+
+# Fields that are compared separately rather than as values.
+SKIPPED_FIELDS: dict[type[TES3Object], set[str]] = {Cell: {"references"}}
+
+
+class RecordChange(NamedTuple):
+    """A record that was added, removed or changed.
+
+    References are identified by the key of their cell, followed by their master and reference
+    indices. A reference that moved to another cell is identified by its new cell, and its `fields`
+    start with a `cell` change from the key of the old cell. The `fields` of a changed record may
+    be empty when only its references, or fields that are not decoded (e.g. record flags), differ.
+    """
+
+    type: type[TES3Object]
+    key: Hashable
+    old: TES3Object | None
+    new: TES3Object | None
+    fields: tuple[FieldChange, ...] = ()
+
+
+class PluginDiff(NamedTuple):
+    """The differences between two plugins, in plugin order, followed by any moved references."""
+
+    added: list[RecordChange]
+    removed: list[RecordChange]
+    changed: list[RecordChange]
+
+
+def diff(a: Plugin | str | Path, b: Plugin | str | Path) -> PluginDiff:
+    """Compare two plugins, or two versions of a plugin, record by record.
+
+    Records are matched by type and key (see `record_key`), and references by their master and
+    reference indices. Records with the same fingerprint are skipped without being decoded, so only
+    the records that differ are compared field by field. Paths are opened lazily, which keeps this
+    fast for large masters.
+
+    A plugin may contain several records with the same key, in which case the versions that differ
+    are matched in plugin order, and any extra versions are reported as added or removed.
+    """
+    old_plugin = a if isinstance(a, Plugin) else Plugin.open(str(a))
+    new_plugin = b if isinstance(b, Plugin) else Plugin.open(str(b))
+
+    old_hashes = old_plugin.fingerprints().tolist()
+    new_hashes = new_plugin.fingerprints().tolist()
+    old_records = _differing_records(old_plugin, old_hashes, Counter(new_hashes))
+    new_records = _differing_records(new_plugin, new_hashes, Counter(old_hashes))
+
+    result = PluginDiff([], [], [])
+    for key, old_versions in old_records.items():
+        for old, _ in old_versions[len(new_records.get(key, ())) :]:
+            result.removed.append(RecordChange(*key, old, None))
+
+    for key, new_versions in new_records.items():
+        old_versions = old_records.get(key, [])
+        for i, (new, new_hash) in enumerate(new_versions):
+            if i >= len(old_versions):
+                result.added.append(RecordChange(*key, None, new))
+                continue
+            old, old_hash = old_versions[i]
+            _diff_record(result, key, old, new, bool(old_hash and new_hash))
+
+    _match_moved_references(result)
+    return result
+
+
+def _diff_record(
+    result: PluginDiff,
+    key: tuple[type[TES3Object], Hashable],
+    old: TES3Object,
+    new: TES3Object,
+    hashed: bool,
+) -> None:
+    """Compare two versions of a record, and of the references of a cell."""
+    ty, record = key
+    fields = tuple(field_changes(ty, old, new, SKIPPED_FIELDS))
+    references = PluginDiff([], [], [])
+    if ty is Cell:
+        references = _diff_references(record, old, new)  # type: ignore[arg-type]
+    # records without original bytes only count as changed if something that was decoded differs
+    if fields or any(references) or hashed:
+        result.changed.append(RecordChange(ty, record, old, new, fields))
+    for changes, reference_changes in zip(result, references):
+        changes += reference_changes
+
+
+def _differing_records(
+    plugin: Plugin,
+    hashes: list[int],
+    other: Counter[int],
+) -> dict[tuple[type[TES3Object], Hashable], list[tuple[TES3Object, int]]]:
+    """Decode the records whose bytes are not found in the other plugin, with their hashes, by type and key.
+
+    Each fingerprint of the other plugin only skips one record, so that duplicates are kept.
+    """
+    records: dict[tuple[type[TES3Object], Hashable], list[tuple[TES3Object, int]]] = {}
+    for i, content_hash in enumerate(hashes):
+        if content_hash and other[content_hash]:
+            other[content_hash] -= 1
+            continue
+        obj = plugin.objects[i]
+        records.setdefault((wrapper_type(obj), record_key(obj)), []).append((obj, content_hash))
+    return records
+
+
+def _diff_references(cell_key: Hashable, old: Cell, new: Cell) -> PluginDiff:
+    """Compare the references of two versions of a cell, by master and reference index."""
+    result = PluginDiff([], [], [])
+    old_references, new_references = old.references, new.references
+    for key in old_references:
+        if key not in new_references:
+            result.removed.append(RecordChange(Reference, (cell_key, *key), old_references[key], None))
+    for key in new_references:
+        if key not in old_references:
+            result.added.append(RecordChange(Reference, (cell_key, *key), None, new_references[key]))
+        elif fields := field_changes(Reference, old_references[key], new_references[key]):
+            change = RecordChange(Reference, (cell_key, *key), old_references[key], new_references[key], tuple(fields))
+            result.changed.append(change)
+    return result
+
+
+def _match_moved_references(result: PluginDiff) -> None:
+    """Replace each reference removed from one cell and added to another by a change of its cell."""
+    removed = {_reference_index(change): change for change in result.removed if change.type is Reference}
+    added = {_reference_index(change): change for change in result.added if change.type is Reference}
+    moved = removed.keys() & added.keys()
+    if not moved:
+        return
+    result.removed[:] = [change for change in result.removed if _reference_index(change) not in moved]
+    result.added[:] = [change for change in result.added if _reference_index(change) not in moved]
+    for index, new in added.items():
+        if index in moved:
+            old = removed[index]
+            cell = FieldChange("cell", old.key[0], new.key[0])  # type: ignore[index]
+            fields = (cell, *field_changes(Reference, old.old, new.new))
+            result.changed.append(RecordChange(Reference, new.key, old.old, new.new, fields))
+
+
+def _reference_index(change: RecordChange) -> Hashable:
+    """Get the master and reference indices of a reference change, which identify it across cells."""
+    return change.key[1:] if change.type is Reference else None  # type: ignore[index]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import math
+from types import ModuleType
+from typing import Any, Collection, Mapping, NamedTuple
+
+from .object import TES3Object, wrapper_type
+
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FieldChange(NamedTuple):
+    """A field whose value differs between two versions of a record. Nested fields are dotted."""
+
+    field: str
+    old: Any
+    new: Any
+
+
+def field_changes(
+    ty: type,
+    old: Any,
+    new: Any,
+    skipped: Mapping[type, Collection[str]] = {},
+    prefix: str = "",
+) -> list[FieldChange]:
+    """Compare the fields of two objects of the same type, descending into nested objects.
+
+    The objects may be wrapped or native objects. Fields listed in `skipped` for their type are
+    not compared.
+    """
+    changes = []
+    skipped_fields = skipped.get(ty, ())
+    for field in ty.__annotations__:
+        if field.startswith("_") or field in skipped_fields:
+            continue
+        old_value, new_value = getattr(old, field), getattr(new, field)
+        nested = wrapper_type(old_value)
+        if is_object_type(nested) and wrapper_type(new_value) is nested:
+            changes += field_changes(nested, old_value, new_value, skipped, f"{prefix}{field}.")
+        elif not values_equal(old_value, new_value):
+            changes.append(FieldChange(prefix + field, old_value, new_value))
+    return changes
+
+
+def values_equal(a: Any, b: Any) -> bool:
+    """Compare two field values, comparing nested objects, sequences and mappings by their contents."""
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(map(values_equal, a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(values_equal(a[key], b[key]) for key in a)
+    ty = wrapper_type(a)
+    if is_object_type(ty) and wrapper_type(b) is ty:
+        return not field_changes(ty, a, b)
+    if np is not None and isinstance(a, np.ndarray):
+        return bool(np.array_equal(a, b))
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return bool(a == b)
+
+
+def is_object_type(ty: type) -> bool:
+    return isinstance(ty, type) and issubclass(ty, TES3Object)
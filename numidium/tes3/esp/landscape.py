@@ -1,7 +1,52 @@
 from __future__ import annotations
 
+import struct
+from itertools import accumulate
+from types import ModuleType
+from typing import Any
+
 from ..typing import *
 from .object import TES3Object
+from .reader import iter_subrecords
+
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class _VertexDataField:
+    """A vertex data field of a landscape, read from the subrecord with the given tag.
+
+    The vertex data is wrapped together with a view of its subrecord when the original bytes of the
+    landscape are available, so that it can be exposed without copying or boxing every value.
+    Assigning the field marks the landscape as modified, like other fields.
+    """
+
+    name: str
+    tag: bytes
+
+    def __init__(self, tag: bytes) -> None:
+        self.tag = tag
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj: TES3Object | None, owner: type | None = None) -> Any:
+        if obj is None:
+            return self
+        source = getattr(obj._wrapped, self.name)
+        if source is None:
+            return None
+        raw = None
+        if obj._raw is not None:
+            raw = next((view for t, view in iter_subrecords(memoryview(obj._raw)) if t == self.tag), None)
+        return TES3Object.wrap(source, raw)
+
+    def __set__(self, obj: TES3Object, value: TES3Object | None) -> None:
+        setattr(obj._wrapped, self.name, value._wrapped if isinstance(value, TES3Object) else value)
+        obj._raw = None
 
 
 class Landscape(TES3Object):
@@ -9,30 +54,103 @@ class Landscape(TES3Object):
     flags2: u32
     grid: tuple[i32, i32] | None
     landscape_flags: u32 | None
-    vertex_normals: VertexNormals | None
-    vertex_heights: VertexHeights | None
-    world_map_data: WorldMapData | None
-    vertex_colors: VertexColors | None
-    texture_indices: TextureIndices | None
+    vertex_normals: VertexNormals | None = _VertexDataField(b"VNML")  # type: ignore[assignment]
+    vertex_heights: VertexHeights | None = _VertexDataField(b"VHGT")  # type: ignore[assignment]
+    world_map_data: WorldMapData | None = _VertexDataField(b"WNAM")  # type: ignore[assignment]
+    vertex_colors: VertexColors | None = _VertexDataField(b"VCLR")  # type: ignore[assignment]
+    texture_indices: TextureIndices | None = _VertexDataField(b"VTEX")  # type: ignore[assignment]
     deleted: u32 | None
 
 
-class VertexNormals(TES3Object):
+class VertexData(TES3Object):
+    """Base class of landscape vertex data, exposed as arrays of a fixed shape and type.
+
+    When NumPy is available `data` is a NumPy array, otherwise it is a memoryview (or the decoded
+    list, if the original bytes are not available). Arrays are zero-copy views into the original
+    bytes of the landscape when those are available, and must not be modified.
+    """
+
+    format: str = ""
+    shape: tuple[int, ...] = ()
+    start: int = 0
+
+    @property
+    def data(self) -> Any:
+        raw = self._raw
+        if raw is None:
+            values = self._wrapped.data  # type: ignore[attr-defined]
+            return values if np is None else np.array(values, dtype=self.format).reshape(self.shape)
+
+        size = struct.calcsize(self.format)
+        for n in self.shape:
+            size *= n
+        view = memoryview(raw)[self.start : self.start + size]
+        if np is None:
+            return view.cast(self.format, self.shape)  # type: ignore[call-overload]
+        return np.frombuffer(view, dtype=self.format).reshape(self.shape)
+
+    @data.setter
+    def data(self, value: Any) -> None:
+        self._wrapped.data = np.asarray(value).ravel().tolist() if np is not None else list(value)  # type: ignore
+        self._raw = None
+
+
+class VertexNormals(VertexData):
     data: list[i8]  # size=(3 * 65 * 65)
 
+    format = "b"
+    shape = (65, 65, 3)
+
 
-class VertexHeights(TES3Object):
+class VertexHeights(VertexData):
     offset: f32
     data: list[i8]  # size=(65 * 65)
 
+    format = "b"
+    shape = (65, 65)
+    start = 4
+
+    def heights(self) -> Any:
+        """Decode the height deltas into absolute heights, in game units.
 
-class WorldMapData(TES3Object):
+        The first delta of each row is relative to the first height of the previous row (starting
+        from `offset`), while the other deltas are relative to the previous height within the row.
+        Returns a NumPy array, or a list of rows without NumPy.
+        """
+        if np is not None:
+            deltas = np.asarray(self.data, dtype=np.float32)
+            deltas[:, 0] = np.cumsum(deltas[:, 0]) + self.offset
+            return np.cumsum(deltas, axis=1) * 8
+
+        data: Any = self.data
+        width = self.shape[1]
+        rows: list[Any] = (
+            data.tolist() if isinstance(data, memoryview) else [data[i : i + width] for i in range(0, len(data), width)]
+        )
+        heights = []
+        first = self.offset
+        for row in rows:
+            first += row[0]
+            heights.append([height * 8 for height in accumulate(row[1:], initial=first)])
+        return heights
+
+
+class WorldMapData(VertexData):
     data: list[i8]  # size=(9 * 9)
 
+    format = "b"
+    shape = (9, 9)
 
-class VertexColors(TES3Object):
+
+class VertexColors(VertexData):
     data: list[u8]  # size=(3 * 65 * 65)
 
+    format = "B"
+    shape = (65, 65, 3)
+
 
-class TextureIndices(TES3Object):
+class TextureIndices(VertexData):
     data: list[u16]  # size=(16 * 16)
+
+    format = "H"
+    shape = (16, 16)
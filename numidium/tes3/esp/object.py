@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+from operator import attrgetter
 from typing import Any
 
 from .. import _tes3  # type: ignore
@@ -7,11 +9,42 @@ from .. import _tes3  # type: ignore
 WRAPPERS: dict[type, type] = {}
 
 
+def _field(name: str) -> property:
+    """Create a property that forwards reads and writes of a field to the wrapped object.
+
+    Reads go through a C-level `attrgetter`, avoiding the failed lookup and Python call that the
+    `__getattr__` fallback costs. Writes discard the original serialized bytes, marking the object
+    as modified. Nested objects are not tracked, so they must be assigned back to their parent.
+    """
+
+    def setter(self: TES3Object, value: Any) -> None:
+        setattr(self._wrapped, name, value)
+        self._raw = None
+
+    return property(attrgetter(f"_wrapped.{name}"), setter)
+
+
+def content_hash(raw: bytes | memoryview) -> int:
+    """Compute the 64-bit content hash of the serialized bytes of a record."""
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+def wrapper_type(obj: Any) -> type[TES3Object]:
+    """Get the wrapper type of an object, which may be wrapped or a native object."""
+    return WRAPPERS.get(type(obj), type(obj))
+
+
 class TES3Meta(type):
     def __new__(cls, name: str, bases: tuple[type, ...], namespace: dict[str, Any]) -> type:
 
         # optimize slots
-        namespace["__slots__"] = ("_wrapped",)
+        namespace["__slots__"] = namespace.get("__slots__", ()) if bases else ("_wrapped", "_raw", "_fingerprint")
+
+        # optimize field access
+        for field in namespace.get("__annotations__", {}):
+            if field.startswith("_") or field in namespace or any(hasattr(base, field) for base in bases):
+                continue  # private, or explicitly defined
+            namespace[field] = _field(field)
 
         # create the type
         ty = super().__new__(cls, name, bases, namespace)
@@ -25,6 +58,8 @@ class TES3Meta(type):
 
 class TES3Object(metaclass=TES3Meta):
     _wrapped: object
+    _raw: bytes | memoryview | None
+    _fingerprint: int
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self._wrapped, name)
@@ -37,12 +72,37 @@ class TES3Object(metaclass=TES3Meta):
         return f"{self.type_name}({fields})"
 
     @staticmethod
-    def wrap(source: Any) -> TES3Object:
+    def wrap(source: Any, raw: bytes | memoryview | None = None) -> TES3Object:
         cls: type = WRAPPERS[type(source)]
         instance: TES3Object = cls.__new__(cls)  # type: ignore[call-overload]
         instance._wrapped = source
+        instance._raw = raw
         return instance
 
+    @property
+    def modified(self) -> bool:
+        """Whether the object was modified, or created, since it was read from a plugin.
+
+        Only assignments to the fields of the object itself are tracked, not edits to its nested
+        objects or lists. `Plugin.save` only detects those when asked to verify.
+        """
+        return self._raw is None
+
+    @property
+    def fingerprint(self) -> int | None:
+        """A hash of the original bytes of the object, or `None` if it was modified or created.
+
+        Objects with equal fingerprints were read from identical bytes. The hash is computed on
+        first access.
+        """
+        if self._raw is None:
+            return None
+        try:
+            return self._fingerprint
+        except AttributeError:
+            fingerprint = self._fingerprint = content_hash(self._raw)
+            return fingerprint
+
     @property
     def type_name(self) -> str:
         return type(self).__name__
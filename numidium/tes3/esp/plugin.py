@@ -1,18 +1,474 @@
 from __future__ import annotations
 
+import os
+from array import array
+from concurrent.futures import Executor, ThreadPoolExecutor
+from mmap import ACCESS_READ
+from mmap import mmap as MemoryMap
+from pathlib import Path
+from types import ModuleType, TracebackType
+from typing import Any, Hashable, Iterable, Iterator, NamedTuple, Sequence, overload
+
 from .. import _tes3  # type: ignore
-from .object import TES3Object
+from .cache import PluginCache
+from .cell import Cell
+from .compare import values_equal
+from .header import Header
+from .object import TES3Object, content_hash, wrapper_type
+from .reader import (
+    RECORD_HEADER,
+    Buffer,
+    RecordHeaders,
+    decode_raw_records,
+    decode_records,
+    encode_header,
+    iter_subrecords,
+)
+from .records import RECORD_TAGS, RECORD_TYPES, normalize_key, record_key
+from .reference import Reference
+from .table import RecordTable
+
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LazyObjects(Sequence[TES3Object]):
+    """A read-only sequence of records which are only decoded when first accessed.
+
+    Only the record headers are scanned up front. Accessing a record decodes it together with all
+    other records of the same type, so that iterating over a single type stays cheap.
+    """
+
+    _buffer: Buffer
+    _records: RecordHeaders
+    _objects: list[TES3Object | None]
+    _positions: dict[bytes, array[int]]
+    _fingerprints: array[int] | None
+
+    def __init__(self, buffer: Buffer, records: RecordHeaders | None = None) -> None:
+        self._buffer = buffer
+        self._records = RecordHeaders.scan(buffer) if records is None else records
+        self._objects = [None] * len(self._records)
+        self._positions = self._records.positions()
+        self._fingerprints = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @overload
+    def __getitem__(self, index: int) -> TES3Object:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[TES3Object]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> TES3Object | list[TES3Object]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        obj = self._objects[index]
+        if obj is None:
+            self._decode(self._records[index].tag)
+            obj = self._objects[index]
+        return obj  # type: ignore[return-value]
+
+    @property
+    def records(self) -> RecordHeaders:
+        return self._records
+
+    def type_positions(self) -> dict[type[TES3Object], Sequence[int]]:
+        """Get the positions of each record type, without decoding any records."""
+        return {RECORD_TYPES[tag]: positions for tag, positions in self._positions.items()}
+
+    def view(self, index: int) -> memoryview:
+        """Get a zero-copy view of the raw bytes of the record at the given index."""
+        offset = self._records.offsets[index]
+        return memoryview(self._buffer)[offset : offset + RECORD_HEADER.size + self._records.sizes[index]]
+
+    def fingerprints(self) -> array[int]:
+        """Get the content hash of each record, or 0 for records that were modified.
+
+        The hashes of the original bytes are computed once, without decoding any records.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = array("Q", [content_hash(self.view(i)) for i in range(len(self._records))])
+        fingerprints = array("Q", self._fingerprints)
+        for i, obj in enumerate(self._objects):
+            if obj is not None and obj._raw is None:
+                fingerprints[i] = 0
+        return fingerprints
+
+    def _decode(self, tag: bytes) -> None:
+        """Decode and wrap all records with the given tag."""
+        positions = self._positions[tag]
+        records = [self._records[i] for i in positions]
+        for i, obj in zip(positions, decode_records(self._buffer, records)):
+            self._objects[i] = TES3Object.wrap(obj, self.view(i))
+
+    def iter_raw(self) -> Iterator[TES3Object | memoryview]:
+        """Iterate over the decoded records, or the raw bytes of records that were never accessed."""
+        for i, obj in enumerate(self._objects):
+            yield self.view(i) if obj is None else obj
+
+    def release(self) -> None:
+        """Release the underlying buffer, if it is a memory mapping that nothing else is viewing."""
+        if isinstance(self._buffer, MemoryMap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass  # released once the last view is gone
 
 
 class Plugin:
-    objects: list[TES3Object]
+    objects: Sequence[TES3Object]
+
+    _type_index: dict[type[TES3Object], Sequence[int]] | None
+    _id_index: dict[type[TES3Object], dict[Hashable, int]]
+    _cache: tuple[PluginCache, str] | None
+
+    def __init__(self, objects: Sequence[TES3Object] | None = None) -> None:
+        self.objects = [] if objects is None else objects
+        self._type_index = None
+        self._id_index = {}
+        self._cache = None
+
+    def __enter__(self) -> Plugin:
+        return self
+
+    def __exit__(self, ty: type[BaseException] | None, value: BaseException | None, tb: TracebackType | None) -> None:
+        self.close()
+
+    @staticmethod
+    def load(path: str | Path, lazy: bool = False, wrap: bool = True) -> Plugin:
+        """Load a plugin from the given path.
+
+        When `lazy` is set only the record headers are read up front, and records are decoded as
+        they are accessed. This is much faster when only a few record types are needed.
+
+        When `wrap` is unset the native objects are exposed directly, without a wrapper for each
+        record. Queries such as `by_type` and `get` still work, and individual records can be
+        wrapped on demand with `TES3Object.wrap`. Lazy plugins always wrap their records, and
+        plugins of native objects cannot be saved.
+        """
+        if lazy:
+            if not wrap:
+                raise ValueError("Lazy plugins always wrap their records.")
+            return Plugin.open(path)
+
+        objects = _tes3.load_objects(str(path))
+        if not wrap:
+            return Plugin(objects)
+
+        # keep the original bytes of each record, so that it can be saved and fingerprinted
+        with open(path, "rb") as f:
+            data = memoryview(f.read())
+        records = RecordHeaders.scan(data)
+        if len(records) != len(objects):
+            # the records cannot be matched to the objects of the native loader
+            return Plugin([TES3Object.wrap(obj) for obj in objects])
+
+        ends = (offset + RECORD_HEADER.size + size for offset, size in zip(records.offsets, records.sizes))
+        return Plugin(
+            [TES3Object.wrap(obj, data[offset:end]) for obj, offset, end in zip(objects, records.offsets, ends)]
+        )
 
     @staticmethod
-    def load(path: str) -> Plugin:
-        plugin = Plugin()
-        plugin.objects = []
+    def open(path: str | Path, mmap: bool = False, cache: PluginCache | None = None) -> Plugin:
+        """Open a plugin from the given path for lazy access.
 
-        for obj in _tes3.load_objects(path):
-            plugin.objects.append(TES3Object.wrap(obj))
+        When `mmap` is set the file is memory mapped rather than read into memory, so raw records
+        and subrecords can be accessed without copying them. Use `close` (or a `with` block) to
+        release the mapping once all views into it have been released.
 
+        When a `cache` is given the record table and ID indexes are restored from it if the file
+        is unchanged, and stored into it otherwise.
+        """
+        if mmap:
+            with open(path, "rb") as f:
+                buffer: Buffer = MemoryMap(f.fileno(), 0, access=ACCESS_READ)
+        else:
+            buffer = Path(path).read_bytes()
+
+        if cache is None:
+            return Plugin(LazyObjects(buffer))
+
+        path = str(path)
+        if cached := cache.load(path):
+            records, keys = cached
+            plugin = Plugin(LazyObjects(buffer, records))
+            plugin._id_index = {RECORD_TYPES[tag]: index for tag, index in keys.items()}
+        else:
+            plugin = Plugin(LazyObjects(buffer))
+            cache.save(path, plugin._lazy_objects().records, {})
+
+        plugin._cache = (cache, path)
         return plugin
+
+    def close(self) -> None:
+        """Release the memory mapping of a plugin opened with `mmap` set.
+
+        Decoded records keep views of their original bytes, so the mapping stays alive until they
+        are released too.
+        """
+        if isinstance(self.objects, LazyObjects):
+            self.objects.release()
+
+    def save(self, path: str | Path, verify: bool = False) -> None:
+        """Save the plugin to the given path.
+
+        Records that were not modified since they were read are copied through as their original
+        bytes, and records that were never accessed are not decoded at all. The header is always
+        re-encoded so that its record count matches. There is no encoder for other records, so
+        modified records raise `ValueError`.
+
+        Only assignments to the fields of a record mark it as modified, while edits to its nested
+        objects (e.g. `npc.data.level = 1`), lists or references do not, and such records are saved
+        as their original bytes. When `verify` is set the decoded records are decoded again from
+        their original bytes and compared, so that such edits are rejected too. This costs a full
+        decode of every record that was decoded, which for an eagerly loaded plugin is all of them.
+        """
+        if not isinstance(self.objects, LazyObjects) and not all(isinstance(obj, TES3Object) for obj in self.objects):
+            raise ValueError("Native objects cannot be saved, load the plugin with `wrap=True` instead.")
+
+        header, *objects = self.objects.iter_raw() if isinstance(self.objects, LazyObjects) else self.objects
+        if not isinstance(header, Header):
+            header = self.objects[0]
+        if not isinstance(header, Header):
+            raise ValueError("The first record of a plugin must be its header.")
+
+        chunks: list[bytes | memoryview] = [encode_header(header, len(objects))]
+        decoded = []
+        modified = []
+        for obj in objects:
+            if isinstance(obj, memoryview):
+                chunks.append(obj)
+            elif obj._raw is not None:
+                chunks.append(obj._raw)
+                decoded.append(obj)
+            else:
+                modified.append(obj)
+        if verify and decoded:
+            modified += _edited_objects(header, decoded)
+        if modified:
+            names = ", ".join(f"{obj.type_name} {record_key(obj)!r}" for obj in modified[:10])
+            more = f" and {len(modified) - 10} more" if len(modified) > 10 else ""
+            raise ValueError(f"Modified records cannot be encoded: {names}{more}.")
+
+        path = Path(path)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.writelines(chunks)
+        os.replace(temp_path, path)
+
+    def raw(self, index: int) -> memoryview:
+        """Get a zero-copy view of the raw bytes of the record at the given index."""
+        return self._lazy_objects().view(index)
+
+    def subrecords(self, index: int) -> Iterator[tuple[bytes, memoryview]]:
+        """Iterate over the raw subrecords of the record at the given index.
+
+        Yields each subrecord's tag and a zero-copy view of its data, e.g. `b"SCDT"` for the
+        bytecode of a `Script`, or `b"VHGT"` for the vertex heights of a `Landscape`.
+        """
+        return iter_subrecords(self.raw(index))
+
+    def fingerprints(self) -> Any:
+        """Get the fingerprint of every record, in plugin order (see `TES3Object.fingerprint`).
+
+        Records without their original bytes have a fingerprint of 0. Returns a NumPy array of
+        unsigned 64-bit integers if NumPy is available, and an `array.array` otherwise. Lazily
+        opened plugins do not decode anything.
+        """
+        if isinstance(self.objects, LazyObjects):
+            fingerprints = self.objects.fingerprints()
+        else:
+            fingerprints = array("Q", [getattr(obj, "fingerprint", None) or 0 for obj in self.objects])
+        return fingerprints if np is None else np.frombuffer(fingerprints, dtype=np.uint64)
+
+    def by_type(self, ty: type[TES3Object]) -> list[TES3Object]:
+        """Get all records of the given type, in plugin order."""
+        return [self.objects[i] for i in self._get_type_index().get(ty, ())]
+
+    def by_types(self, *types: type[TES3Object]) -> list[TES3Object]:
+        """Get all records of any of the given types, in plugin order."""
+        index = self._get_type_index()
+        return [self.objects[i] for i in sorted(i for ty in types for i in index.get(ty, ()))]
+
+    def count(self, ty: type[TES3Object]) -> int:
+        """Count the records of the given type. Lazily opened plugins do not decode anything."""
+        return len(self._get_type_index().get(ty, ()))
+
+    def to_columns(self, ty: type[TES3Object], fields: Iterable[str]) -> RecordTable:
+        """Build a columnar table from the given (dotted) fields of all records of the given type."""
+        return RecordTable.build(ty, self.by_type(ty), fields)
+
+    def get(self, ty: type[TES3Object], key: Hashable, default: TES3Object | None = None) -> TES3Object | None:
+        """Get the record of the given type with the given key, ignoring case.
+
+        Keys are usually record IDs, see `record_key` for the exceptions. When a plugin contains
+        several records with the same key, the last of them is returned.
+        """
+        i = self._get_id_index(ty).get(normalize_key(key))
+        return default if i is None else self.objects[i]
+
+    def get_many(self, ty: type[TES3Object], keys: Iterable[Hashable]) -> list[TES3Object | None]:
+        """Get the records of the given type for each of the given keys, or `None` if missing."""
+        index = self._get_id_index(ty)
+        positions = [index.get(normalize_key(key)) for key in keys]
+        return [None if i is None else self.objects[i] for i in positions]
+
+    def _get_id_index(self, ty: type[TES3Object]) -> dict[Hashable, int]:
+        """Get the positions of each record of the given type by key, building the index on first use."""
+        index = self._id_index.get(ty)
+        if index is None:
+            positions = self._get_type_index().get(ty, [])
+            index = self._id_index[ty] = {record_key(self.objects[i]): i for i in positions}
+            self._save_cache(ty)
+        return index
+
+    def _get_type_index(self) -> dict[type[TES3Object], Sequence[int]]:
+        """Get the positions of each record type, building the index on first use."""
+        if self._type_index is None:
+            if isinstance(self.objects, LazyObjects):
+                self._type_index = self.objects.type_positions()
+            else:
+                type_index: dict[type[TES3Object], list[int]] = {}
+                for i, obj in enumerate(self.objects):
+                    type_index.setdefault(wrapper_type(obj), []).append(i)
+                self._type_index = dict(type_index)
+        return self._type_index
+
+    def _save_cache(self, ty: type[TES3Object]) -> None:
+        """Add the ID index of a type to the cache the plugin was opened with."""
+        if self._cache is not None:
+            cache, path = self._cache
+            cache.save_keys(path, {RECORD_TAGS[ty]: self._id_index[ty]})
+
+    def _lazy_objects(self) -> LazyObjects:
+        if not isinstance(self.objects, LazyObjects):
+            raise ValueError("Raw record access requires a plugin created with `Plugin.open`.")
+        return self.objects
+
+
+class LoadResult(NamedTuple):
+    """The outcome of loading a single plugin with `load_many`."""
+
+    path: str
+    plugin: Plugin | None
+    error: Exception | None
+
+
+def _load(path: str, lazy: bool) -> LoadResult:
+    try:
+        return LoadResult(path, Plugin.load(path, lazy), None)
+    except Exception as e:
+        return LoadResult(path, None, e)
+
+
+def load_many(
+    paths: Iterable[str | Path],
+    workers: int | None = None,
+    lazy: bool = False,
+    executor: Executor | None = None,
+) -> Iterator[LoadResult]:
+    """Load many plugins, yielding the results in the order of the given paths.
+
+    Each result is yielded as soon as it and all results before it are ready. Failures are
+    reported per file through `LoadResult.error` rather than raised.
+
+    Plugins are loaded one after another, unless `workers` or an `executor` is given, in which case
+    they are loaded concurrently on a thread pool of `workers` threads or on the executor. Threads
+    only speed up loading where the native loader releases the GIL, so measure with
+    `tools/benchmark_load.py` first. Plugins are not loaded on a process pool, as their native
+    objects would have to be pickled back to the calling process.
+    """
+    if workers is None and executor is None:
+        for path in paths:
+            yield _load(str(path), lazy)
+        return
+
+    pool = ThreadPoolExecutor(workers) if executor is None else executor
+    try:
+        futures = [pool.submit(_load, str(path), lazy) for path in paths]
+        for future in futures:
+            yield future.result()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+
+def iter_records(
+    path: str | Path,
+    types: Iterable[type[TES3Object]] | None = None,
+    batch_size: int = 4 * 1024 * 1024,
+) -> Iterator[TES3Object]:
+    """Iterate over the records of a plugin, without loading the whole plugin into memory.
+
+    Only records of the given types are decoded, all others are skipped by their header size.
+    Matching records are read and decoded in batches of about `batch_size` bytes. References are
+    stored within cells, so asking for `Reference` decodes every cell and yields its references.
+
+    Raises `ValueError` if a type is neither a record type nor `Reference`.
+    """
+    tags = None
+    if types is not None:
+        types = set(types)
+        if unknown := [ty.__name__ for ty in types if ty not in RECORD_TAGS and ty is not Reference]:
+            raise ValueError(f"Not a record type: {', '.join(unknown)}")
+        tags = {RECORD_TAGS[Cell] if ty is Reference else RECORD_TAGS[ty] for ty in types}
+
+    with open(path, "rb") as f:
+        header = f.read(RECORD_HEADER.size)
+        header += f.read(RECORD_HEADER.unpack(header)[1])
+        if tags is None or b"TES3" in tags:
+            yield TES3Object.wrap(decode_raw_records([header])[0], header)
+
+        batch: list[bytes] = []
+        batch_bytes = 0
+        while data := f.read(RECORD_HEADER.size):
+            tag, size, *_ = RECORD_HEADER.unpack(data)
+            if tags is not None and tag not in tags:
+                f.seek(size, 1)
+                continue
+
+            batch.append(data + f.read(size))
+            batch_bytes += RECORD_HEADER.size + size
+            if batch_bytes >= batch_size:
+                yield from _select(_decode_batch(header, batch), types)
+                batch.clear()
+                batch_bytes = 0
+
+        if batch:
+            yield from _select(_decode_batch(header, batch), types)
+
+
+def _decode_batch(header: bytes, batch: list[bytes]) -> Iterator[TES3Object]:
+    for obj, raw in zip(decode_raw_records([header, *batch])[1:], batch):
+        yield TES3Object.wrap(obj, raw)
+
+
+def _edited_objects(header: Header, objects: list[TES3Object]) -> list[TES3Object]:
+    """Find the objects that no longer match their original bytes, by decoding those again."""
+    raws = [obj._raw for obj in objects if obj._raw is not None]
+    originals = decode_raw_records([encode_header(header, len(raws)), *raws])[1:]
+    if len(originals) != len(objects):
+        raise ValueError("The original records of the plugin could not be decoded again.")
+    return [obj for obj, original in zip(objects, originals) if not values_equal(obj._wrapped, original)]
+
+
+def _select(objects: Iterator[TES3Object], types: set[type[TES3Object]] | None) -> Iterator[TES3Object]:
+    """Replace cells by their references if those were asked for, keeping the cells only if they were too."""
+    if types is None or Reference not in types:
+        yield from objects
+        return
+    for obj in objects:
+        if isinstance(obj, Cell):
+            if Cell in types:
+                yield obj
+            yield from obj.references.values()
+        else:
+            yield obj
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import struct
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from mmap import mmap
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, NamedTuple, Sequence, overload
+
+from .. import _tes3  # type: ignore
+from .enums import FileType
+from .header import Header
+
+Buffer = bytes | bytearray | memoryview | mmap
+
+RECORD_HEADER = struct.Struct("<4sIII")
+SUBRECORD_HEADER = struct.Struct("<4sI")
+
+HEDR = struct.Struct("<fI32s256sI")
+
+
+class RecordHeader(NamedTuple):
+    """The location and fixed-size header of a record within a plugin."""
+
+    tag: bytes
+    size: int
+    flags1: int
+    flags2: int
+    offset: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + RECORD_HEADER.size + self.size
+
+
+def scan_records(buffer: Buffer) -> Iterator[RecordHeader]:
+    """Iterate over the record headers of a plugin, without decoding their contents."""
+    offset, length = 0, len(buffer)
+    unpack_from = RECORD_HEADER.unpack_from
+    while offset < length:
+        tag, size, flags1, flags2 = unpack_from(buffer, offset)
+        yield RecordHeader(bytes(tag), size, flags1, flags2, offset)
+        offset += RECORD_HEADER.size + size
+
+
+class RecordHeaders(Sequence[RecordHeader]):
+    """The record headers of a plugin, stored as compact columns.
+
+    The columns are plain arrays, so they can be stored and restored without creating an object
+    for every record.
+
+    Attributes
+    ----------
+    tags : bytes
+        The four character tags of all records, concatenated.
+    sizes : array[int]
+        The size of each record, excluding its header.
+    flags1 : array[int]
+        The first flags field of each record.
+    flags2 : array[int]
+        The second flags field of each record.
+    offsets : array[int]
+        The offset of each record within the plugin.
+    """
+
+    tags: bytes
+    sizes: array[int]
+    flags1: array[int]
+    flags2: array[int]
+    offsets: array[int]
+
+    _positions: dict[bytes, array[int]] | None
+
+    def __init__(
+        self,
+        tags: bytes = b"",
+        sizes: array[int] | None = None,
+        flags1: array[int] | None = None,
+        flags2: array[int] | None = None,
+        offsets: array[int] | None = None,
+        positions: dict[bytes, array[int]] | None = None,
+    ) -> None:
+        self.tags = tags
+        self.sizes = array("I") if sizes is None else sizes
+        self.flags1 = array("I") if flags1 is None else flags1
+        self.flags2 = array("I") if flags2 is None else flags2
+        self.offsets = array("Q") if offsets is None else offsets
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @overload
+    def __getitem__(self, index: int) -> RecordHeader:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[RecordHeader]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> RecordHeader | list[RecordHeader]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return RecordHeader(
+            self.tags[index * 4 : index * 4 + 4],
+            self.sizes[index],
+            self.flags1[index],
+            self.flags2[index],
+            self.offsets[index],
+        )
+
+    @staticmethod
+    def scan(buffer: Buffer) -> RecordHeaders:
+        """Scan the record headers of a plugin, without decoding their contents."""
+        tags = bytearray()
+        sizes, flags1, flags2, offsets = array("I"), array("I"), array("I"), array("Q")
+        offset, length = 0, len(buffer)
+        unpack_from = RECORD_HEADER.unpack_from
+        while offset < length:
+            tag, size, f1, f2 = unpack_from(buffer, offset)
+            tags += tag
+            sizes.append(size)
+            flags1.append(f1)
+            flags2.append(f2)
+            offsets.append(offset)
+            offset += RECORD_HEADER.size + size
+        return RecordHeaders(bytes(tags), sizes, flags1, flags2, offsets)
+
+    def positions(self) -> dict[bytes, array[int]]:
+        """Get the positions of the records of each tag, in plugin order."""
+        if self._positions is None:
+            positions: dict[bytes, array[int]] = {}
+            tags = self.tags
+            for i in range(len(self)):
+                tag = tags[i * 4 : i * 4 + 4]
+                if (column := positions.get(tag)) is None:
+                    column = positions[tag] = array("I")
+                column.append(i)
+            self._positions = positions
+        return self._positions
+
+
+def iter_subrecords(view: memoryview) -> Iterator[tuple[bytes, memoryview]]:
+    """Iterate over the subrecords of a record, yielding each tag and a zero-copy view of its data."""
+    offset, length = RECORD_HEADER.size, len(view)
+    unpack_from = SUBRECORD_HEADER.unpack_from
+    while offset < length:
+        tag, size = unpack_from(view, offset)
+        offset += SUBRECORD_HEADER.size
+        yield bytes(tag), view[offset : offset + size]
+        offset += size
+
+
+def decode_records(buffer: Buffer, records: Sequence[RecordHeader]) -> list[Any]:
+    """Decode a subset of records from the buffer using the native loader.
+
+    The leading TES3 record is included automatically, but is only returned when it was requested.
+    """
+    prefix = []
+    if not records or records[0].offset != 0:
+        prefix.append(next(scan_records(buffer)))
+
+    with memoryview(buffer) as view:
+        chunks = [view[record.offset : record.end] for record in prefix + list(records)]
+        objects = decode_raw_records(chunks)
+
+    return objects[len(prefix) :]
+
+
+def decode_raw_records(chunks: Iterable[Buffer]) -> list[Any]:
+    """Decode a sequence of raw records, starting with a TES3 record, using the native loader.
+
+    The native loader only accepts file paths, so the records are written to a temporary plugin.
+    """
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "records.esp"
+        with open(path, "wb") as f:
+            f.writelines(chunks)
+        return _tes3.load_objects(str(path))  # type: ignore[no-any-return]
+
+
+def read_header(path: str | Path) -> Header:
+    """Read the header of a plugin, without reading any of the records that follow it."""
+    with open(path, "rb") as f:
+        data = f.read(RECORD_HEADER.size)
+        tag, size, flags1, flags2 = RECORD_HEADER.unpack(data)
+        if tag != b"TES3":
+            raise ValueError(f"Not a TES3 plugin: {path}")
+        data += f.read(size)
+
+    fields = SimpleNamespace(flags1=flags1, flags2=flags2, masters=[])
+    for sub_tag, view in iter_subrecords(memoryview(data)):
+        if sub_tag == b"HEDR":
+            version, file_type, author, description, num_objects = HEDR.unpack_from(view)
+            fields.version = version
+            fields.file_type = FileType(file_type)
+            fields.author = decode_string(author)
+            fields.description = decode_string(description)
+            fields.num_objects = num_objects
+        elif sub_tag == b"MAST":
+            fields.masters.append((decode_string(view), 0))
+        elif sub_tag == b"DATA":
+            fields.masters[-1] = (fields.masters[-1][0], struct.unpack_from("<Q", view)[0])
+
+    header: Header = Header.__new__(Header)
+    header._wrapped = fields
+    header._raw = data
+    return header
+
+
+def encode_header(header: Header, num_objects: int) -> bytes:
+    """Encode a header as a TES3 record, with the given record count."""
+    data = [
+        SUBRECORD_HEADER.pack(b"HEDR", HEDR.size),
+        HEDR.pack(
+            header.version,
+            int(header.file_type),
+            header.author.encode("cp1252"),
+            header.description.encode("cp1252"),
+            num_objects,
+        ),
+    ]
+    for name, size in header.masters:
+        name = name.encode("cp1252") + b"\0"
+        data += SUBRECORD_HEADER.pack(b"MAST", len(name)), name
+        data += SUBRECORD_HEADER.pack(b"DATA", 8), struct.pack("<Q", size)
+
+    body = b"".join(data)
+    return RECORD_HEADER.pack(b"TES3", len(body), header.flags1, header.flags2) + body
+
+
+class HeaderResult(NamedTuple):
+    """The outcome of reading the header of a single plugin with `read_headers`."""
+
+    path: str
+    header: Header | None
+    error: Exception | None
+
+
+def _read_header(path: str | Path) -> HeaderResult:
+    try:
+        return HeaderResult(str(path), read_header(path), None)
+    except Exception as e:
+        return HeaderResult(str(path), None, e)
+
+
+def read_headers(paths: Iterable[str | Path], workers: int | None = None) -> Iterator[HeaderResult]:
+    """Read the headers of many plugins concurrently, yielding the results in the order of the given paths.
+
+    Failures are reported per file through `HeaderResult.error` rather than raised.
+    """
+    with ThreadPoolExecutor(workers) as executor:
+        yield from executor.map(_read_header, paths)
+
+
+def decode_string(data: bytes | memoryview) -> str:
+    """Decode a null-terminated or null-padded string."""
+    return bytes(data).split(b"\0", 1)[0].decode("cp1252")
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Hashable, cast
+
+from .activator import Activator
+from .alchemy import Alchemy
+from .apparatus import Apparatus
+from .armor import Armor
+from .birthsign import Birthsign
+from .bodypart import Bodypart
+from .book import Book
+from .cell import Cell
+from .class_ import Class
+from .clothing import Clothing
+from .container import Container
+from .creature import Creature
+from .dialogue import Dialogue
+from .door import Door
+from .enchantment import Enchantment
+from .faction import Faction
+from .gamesetting import GameSetting
+from .globalvariable import GlobalVariable
+from .header import Header
+from .info import Info
+from .ingredient import Ingredient
+from .landscape import Landscape
+from .landscapetexture import LandscapeTexture
+from .levelledcreature import LevelledCreature
+from .levelleditem import LevelledItem
+from .light import Light
+from .lockpick import Lockpick
+from .magiceffect import MagicEffect
+from .miscitem import MiscItem
+from .npc import Npc
+from .object import TES3Object, wrapper_type
+from .pathgrid import PathGrid
+from .probe import Probe
+from .race import Race
+from .region import Region
+from .repairtool import RepairTool
+from .script import Script
+from .skill import Skill
+from .sound import Sound
+from .soundgen import SoundGen
+from .spell import Spell
+from .startscript import StartScript
+from .static_ import Static
+from .weapon import Weapon
+
+# The four character tags that identify each top-level record type.
+RECORD_TYPES: dict[bytes, type[TES3Object]] = {
+    b"TES3": Header,
+    b"GMST": GameSetting,
+    b"GLOB": GlobalVariable,
+    b"CLAS": Class,
+    b"FACT": Faction,
+    b"RACE": Race,
+    b"SOUN": Sound,
+    b"SNDG": SoundGen,
+    b"SKIL": Skill,
+    b"MGEF": MagicEffect,
+    b"SCPT": Script,
+    b"REGN": Region,
+    b"BSGN": Birthsign,
+    b"SSCR": StartScript,
+    b"LTEX": LandscapeTexture,
+    b"SPEL": Spell,
+    b"STAT": Static,
+    b"DOOR": Door,
+    b"MISC": MiscItem,
+    b"WEAP": Weapon,
+    b"CONT": Container,
+    b"CREA": Creature,
+    b"BODY": Bodypart,
+    b"LIGH": Light,
+    b"ENCH": Enchantment,
+    b"NPC_": Npc,
+    b"ARMO": Armor,
+    b"CLOT": Clothing,
+    b"REPA": RepairTool,
+    b"ACTI": Activator,
+    b"APPA": Apparatus,
+    b"LOCK": Lockpick,
+    b"PROB": Probe,
+    b"INGR": Ingredient,
+    b"BOOK": Book,
+    b"ALCH": Alchemy,
+    b"LEVI": LevelledItem,
+    b"LEVC": LevelledCreature,
+    b"CELL": Cell,
+    b"LAND": Landscape,
+    b"PGRD": PathGrid,
+    b"DIAL": Dialogue,
+    b"INFO": Info,
+}
+
+RECORD_TAGS: dict[type[TES3Object], bytes] = {ty: tag for tag, ty in RECORD_TYPES.items()}
+
+
+def normalize_key(key: Hashable) -> Hashable:
+    """Case-fold string keys, as record IDs are case-insensitive."""
+    return key.lower() if isinstance(key, str) else key
+
+
+def record_key(obj: TES3Object) -> Hashable | None:
+    """Get the key that identifies a record amongst other records of the same type.
+
+    Most records are identified by their `id`. Interior cells are identified by their name, while
+    exterior cells and landscapes are identified by their grid. Headers have no key.
+    """
+    ty = wrapper_type(obj)
+    if ty is Header:
+        return None
+    if ty is Info:
+        return normalize_key(obj.info_id)
+    if ty is Skill:
+        return cast(Hashable, obj.skill_id)
+    if ty is MagicEffect:
+        return cast(Hashable, obj.effect_id)
+    if ty is Cell:
+        if obj.data is None or obj.data.flags & 0x01:
+            return normalize_key(obj.name)
+        return cast(tuple[int, int], obj.data.grid)
+    if ty is Landscape:
+        return cast(tuple[int, int] | None, obj.grid)
+    if ty is PathGrid:
+        return (normalize_key(obj.cell), obj.data and obj.data.grid)
+    return normalize_key(obj.id)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from operator import attrgetter
+from types import ModuleType
+from typing import Any, Callable, Iterable, Sequence
+
+from .object import TES3Object
+
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Array type codes of the numeric aliases in `tes3.typing`.
+TYPECODES = {
+    "i8": "b",
+    "i16": "h",
+    "i32": "i",
+    "i64": "q",
+    "u8": "B",
+    "u16": "H",
+    "u32": "I",
+    "u64": "Q",
+    "f32": "f",
+    "f64": "d",
+    "bool": "B",
+}
+
+
+def field_typecode(ty: type[TES3Object], field: str) -> str | None:
+    """Get the array type code of a (dotted) field, or `None` if it is not numeric."""
+    *parents, name = field.split(".")
+    for parent in parents:
+        annotation = _base_annotation(ty, parent)
+        ty = vars(sys.modules[ty.__module__]).get(annotation)
+        if not (isinstance(ty, type) and issubclass(ty, TES3Object)):
+            return None
+    return TYPECODES.get(_base_annotation(ty, name))
+
+
+def _base_annotation(ty: type, name: str) -> str:
+    """Get the annotation of a field, without any `| None` suffix."""
+    annotation: str = ty.__annotations__.get(name, "")
+    return annotation.removesuffix(" | None")
+
+
+class RecordTable:
+    """A columnar table of record fields.
+
+    Numeric fields are stored as NumPy arrays if NumPy is available, and as `array.array` otherwise.
+    Other fields are stored as lists. Missing values (e.g. fields of an absent `data`) are stored as
+    `nan` for floating point columns, `0` for integer columns, and `None` for other columns. Since a
+    stored `0` may also be a real value, the rows with missing values of each numeric column are
+    recorded in `missing`.
+
+    Attributes
+    ----------
+    records : list[TES3Object]
+        The records of each row.
+    columns : dict[str, Sequence[Any]]
+        The values of each field, by field name.
+    missing : dict[str, Sequence[bool]]
+        Whether each row has no value, by field name, for the numeric columns with missing values.
+    """
+
+    records: list[TES3Object]
+    columns: dict[str, Sequence[Any]]
+    missing: dict[str, Sequence[bool]]
+
+    def __init__(
+        self,
+        records: list[TES3Object],
+        columns: dict[str, Sequence[Any]],
+        missing: dict[str, Sequence[bool]] | None = None,
+    ) -> None:
+        self.records = records
+        self.columns = columns
+        self.missing = {} if missing is None else missing
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, field: str) -> Sequence[Any]:
+        return self.columns[field]
+
+    @staticmethod
+    def build(ty: type[TES3Object], records: Iterable[TES3Object], fields: Iterable[str]) -> RecordTable:
+        """Build a table from the given fields of records of the given type."""
+        records = list(records)
+        table = RecordTable(records, {})
+        for field in fields:
+            typecode = field_typecode(ty, field)
+            values = list(map(_getter(field), records))
+            if typecode is None:
+                table.columns[field] = values
+                continue
+            if None in values:
+                table.missing[field] = _array("B", [value is None for value in values], bool)
+                missing = float("nan") if typecode in "fd" else 0
+                values = [missing if value is None else value for value in values]
+            table.columns[field] = _array(typecode, values)
+        return table
+
+    def take(self, indices: Iterable[int]) -> RecordTable:
+        """Build a table from the given rows of this table."""
+        rows: Any = np.asarray(indices, dtype=np.intp) if np is not None else list(indices)
+        return RecordTable(
+            [self.records[i] for i in rows],
+            {k: _take(v, rows) for k, v in self.columns.items()},
+            {k: _take(v, rows) for k, v in self.missing.items()},
+        )
+
+    def filter(self, mask: Iterable[bool]) -> RecordTable:
+        """Build a table from the rows of this table where the mask is true.
+
+        With NumPy the mask is usually a comparison of columns, e.g. `table["data.weight"] > 10`.
+        """
+        if np is not None:
+            return self.take(np.flatnonzero(np.asarray(mask, dtype=bool)))
+        return self.take(i for i, keep in enumerate(mask) if keep)
+
+    def sort(self, field: str, reverse: bool = False) -> RecordTable:
+        """Build a table from the rows of this table, sorted by the given field."""
+        column = self.columns[field]
+        if np is not None and isinstance(column, np.ndarray):
+            indices = np.argsort(column, kind="stable")
+            return self.take(indices[::-1] if reverse else indices)
+        return self.take(sorted(range(len(column)), key=column.__getitem__, reverse=reverse))
+
+
+def _getter(field: str) -> Callable[[TES3Object], Any]:
+    getter = attrgetter(field)
+
+    def get(obj: TES3Object) -> Any:
+        try:
+            return getter(obj)
+        except AttributeError:  # a parent object is missing
+            return None
+
+    return get
+
+
+def _array(typecode: str, values: list[Any], dtype: Any = None) -> Any:
+    if np is not None:
+        return np.array(values, dtype=dtype or typecode)
+    return array(typecode, values)
+
+
+def _take(column: Any, rows: Any) -> Any:
+    if np is not None and isinstance(column, np.ndarray):
+        return column[rows]
+    if isinstance(column, array):
+        return array(column.typecode, [column[i] for i in rows])
+    return [column[i] for i in rows]
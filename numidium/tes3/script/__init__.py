@@ -0,0 +1,21 @@
+from .declarations import *
+from .lint import *
+from .parser import *
+
+__all__ = [
+    "DeclarationResult",
+    "Diagnostic",
+    "Linter",
+    "ParsedScript",
+    "ScriptCache",
+    "ScriptDeclarations",
+    "ScriptError",
+    "Statement",
+    "Token",
+    "parse_declarations",
+    "parse_declarations_many",
+    "parse_load_order",
+    "parse_script",
+    "source_hash",
+    "strip_comment",
+]
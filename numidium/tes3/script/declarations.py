@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Script
+
+from .parser import BEGIN, DECLARATION, strip_comment
+
+__all__ = [
+    "DeclarationResult",
+    "ScriptCache",
+    "ScriptDeclarations",
+    "ScriptError",
+    "parse_declarations",
+    "parse_declarations_many",
+    "parse_load_order",
+    "source_hash",
+]
+
+# Below this many scripts, parsing in-process is faster than starting worker processes.
+PARALLEL_THRESHOLD = 64
+
+
+class ScriptError(ValueError):
+    """An error in the source of a script."""
+
+    message: str
+    line: int
+
+    def __init__(self, message: str, line: int) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.message = message
+        self.line = line
+
+    def __reduce__(self) -> tuple[type, tuple[str, int]]:
+        return ScriptError, (self.message, self.line)
+
+
+class ScriptDeclarations(NamedTuple):
+    """The name and variables declared by a script source, as stored in its SCHD and SCVR subrecords.
+
+    The bytecode of the SCDT subrecord is not produced, as the instruction encoding of the game's
+    compiler is not reproduced. Comparing the declarations with a script record (see `matches`)
+    finds records that were not recompiled after their source changed.
+    """
+
+    name: str
+    shorts: tuple[str, ...]
+    longs: tuple[str, ...]
+    floats: tuple[str, ...]
+
+    @property
+    def variables(self) -> bytes:
+        """The variable names, as stored in the SCVR subrecord."""
+        return b"".join(name.encode("cp1252") + b"\0" for name in (*self.shorts, *self.longs, *self.floats))
+
+    def matches(self, script: Script) -> bool:
+        """Whether the header and variables of a script record agree with these declarations."""
+        header = script.header
+        return (
+            header is not None
+            and script.id.lower() == self.name.lower()
+            and (header.num_shorts, header.num_longs, header.num_floats) == self.counts
+            and header.variables_length == len(self.variables)
+            and bytes(script.variables or b"") == self.variables
+        )
+
+    @property
+    def counts(self) -> tuple[int, int, int]:
+        return len(self.shorts), len(self.longs), len(self.floats)
+
+
+class DeclarationResult(NamedTuple):
+    """The outcome of parsing the declarations of a single script with `parse_declarations_many`."""
+
+    declarations: ScriptDeclarations | None
+    error: ScriptError | None
+
+
+def source_hash(source: str) -> bytes:
+    """Compute the content hash of a script source."""
+    return hashlib.blake2b(source.encode("utf-8"), digest_size=16).digest()
+
+
+def parse_declarations(source: str) -> ScriptDeclarations:
+    """Parse the name and variable declarations of a script source.
+
+    Raises `ScriptError` if the script has no `begin` statement, or declares a variable twice.
+    """
+    name = None
+    variables: dict[str, list[str]] = {"short": [], "long": [], "float": []}
+    declared = set()
+
+    for number, line in enumerate(source.splitlines(), 1):
+        line = strip_comment(line).strip()
+        if not line:
+            continue
+
+        if name is None:
+            if not (match := BEGIN.fullmatch(line)):
+                raise ScriptError("expected 'begin'", number)
+            name = match[1].strip('"')
+        elif match := DECLARATION.fullmatch(line):
+            kind, variable = match[1].lower(), match[2].strip('"')
+            if variable.lower() in declared:
+                raise ScriptError(f"variable '{variable}' is declared twice", number)
+            declared.add(variable.lower())
+            variables[kind].append(variable)
+
+    if name is None:
+        raise ScriptError("expected 'begin'", 1)
+
+    return ScriptDeclarations(name, tuple(variables["short"]), tuple(variables["long"]), tuple(variables["float"]))
+
+
+def _parse(source: str) -> DeclarationResult:
+    try:
+        return DeclarationResult(parse_declarations(source), None)
+    except ScriptError as e:
+        return DeclarationResult(None, e)
+
+
+class ScriptCache:
+    """A persistent cache of script declarations (or diagnostics), keyed by the content hash of their source.
+
+    Attributes
+    ----------
+    path : Path
+        The file the cache is stored in.
+    entries : dict[bytes, Any]
+        The cached results, by source hash.
+    """
+
+    path: Path
+    entries: dict[bytes, Any]
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as f:
+                self.entries = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            self.entries = {}
+
+    def save(self) -> None:
+        """Write the cache to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+
+def parse_declarations_many(
+    sources: Iterable[str],
+    cache: ScriptCache | None = None,
+    workers: int | None = None,
+) -> list[DeclarationResult]:
+    """Parse the declarations of many scripts, in the order of the given sources.
+
+    Sources found in the `cache` are not parsed again, and newly parsed declarations are added to
+    it. When many scripts need parsing they are parsed on a pool of `workers` processes.
+    """
+    sources = list(sources)
+    hashes = [source_hash(source) for source in sources]
+    entries = {} if cache is None else cache.entries
+
+    results: list[DeclarationResult | None] = [
+        None if (declarations := entries.get(h)) is None else DeclarationResult(declarations, None)
+        for h in hashes
+    ]  # fmt: skip
+    missing = [i for i, result in enumerate(results) if result is None]
+    missing_sources = [sources[i] for i in missing]
+
+    if len(missing) < PARALLEL_THRESHOLD:
+        parsed = list(map(_parse, missing_sources))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            chunk_size = max(1, len(missing) // (4 * (workers or os.cpu_count() or 1)))
+            parsed = list(executor.map(_parse, missing_sources, chunksize=chunk_size))
+
+    for i, result in zip(missing, parsed):
+        results[i] = result
+        if result.declarations is not None:
+            entries[hashes[i]] = result.declarations
+
+    return results  # type: ignore[return-value]
+
+
+def parse_load_order(
+    load_order: LoadOrder,
+    cache: ScriptCache | None = None,
+    workers: int | None = None,
+) -> dict[str, DeclarationResult]:
+    """Parse the declarations of the winning scripts of a load order, by lowercased script id.
+
+    Scripts whose record does not match its declarations (see `ScriptDeclarations.matches`) have
+    stale compiled data, and must be recompiled by the game's compiler.
+    """
+    scripts = [s for s in load_order.by_type(Script).values() if isinstance(s, Script) and s.script_text]
+    results = parse_declarations_many([s.script_text for s in scripts], cache, workers)  # type: ignore[misc]
+    return {s.id.lower(): result for s, result in zip(scripts, results)}
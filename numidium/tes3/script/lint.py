@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Dialogue, GlobalVariable, Info, Script
+
+from .declarations import PARALLEL_THRESHOLD, ScriptCache, source_hash
+from .parser import Diagnostic, ParsedScript, Statement, parse_script
+
+__all__ = ["Linter"]
+
+# The arguments of functions whose misuse can be detected, by lowercased name. Each argument is
+# an object id, a script id, a dialogue id or a value (a number or variable).
+FUNCTIONS: dict[str, tuple[str, ...]] = {
+    "additem": ("object", "value"),
+    "addtopic": ("dialogue",),
+    "getitemcount": ("object",),
+    "getjournalindex": ("dialogue",),
+    "journal": ("dialogue", "value"),
+    "placeatme": ("object", "value", "value", "value"),
+    "placeatpc": ("object", "value", "value", "value"),
+    "removeitem": ("object", "value"),
+    "scriptrunning": ("script",),
+    "setjournalindex": ("dialogue", "value"),
+    "startscript": ("script",),
+    "stopscript": ("script",),
+}
+
+# References that are always valid.
+BUILTIN_REFERENCES = {"player", "playerref"}
+
+# Statements that contain an expression.
+EXPRESSIONS = {"if", "elseif", "while", "set"}
+
+# Statements that end a block, and so are reachable after a `return`.
+BLOCK_ENDS = {"elseif", "else", "endif", "endwhile"}
+
+
+class Linter:
+    """Find problems in scripts, checked against the records of a load order.
+
+    Parse trees are cached by the content hash of their source, and so are the diagnostics of
+    each source, so re-linting after an edit only analyses the scripts that changed. Parse trees
+    can be persisted with a `ScriptCache`, which should not be shared with `parse_declarations_many`.
+
+    The known ids are immutable, and assigning any of them discards the cached diagnostics, which
+    depend on them.
+
+    Attributes
+    ----------
+    objects : frozenset[str]
+        The lowercased ids of all records.
+    scripts : frozenset[str]
+        The lowercased ids of all scripts.
+    dialogues : frozenset[str]
+        The lowercased ids of all dialogue topics and journals.
+    globals : frozenset[str]
+        The lowercased ids of all global variables.
+    """
+
+    _objects: frozenset[str]
+    _scripts: frozenset[str]
+    _dialogues: frozenset[str]
+    _globals: frozenset[str]
+    _parses: dict[bytes, ParsedScript]
+    _results: dict[bytes, list[Diagnostic]]
+
+    def __init__(
+        self,
+        objects: Iterable[str] = (),
+        scripts: Iterable[str] = (),
+        dialogues: Iterable[str] = (),
+        globals: Iterable[str] = (),
+        cache: ScriptCache | None = None,
+    ) -> None:
+        self._parses = {} if cache is None else cache.entries
+        self._results = {}
+        self.objects = frozenset(objects)
+        self.scripts = frozenset(scripts)
+        self.dialogues = frozenset(dialogues)
+        self.globals = frozenset(globals)
+
+    # assigning any of the known ids discards the cached diagnostics, which depend on them
+
+    @property
+    def objects(self) -> frozenset[str]:
+        return self._objects
+
+    @objects.setter
+    def objects(self, value: frozenset[str]) -> None:
+        self._objects = _lowered(value)
+        self._results.clear()
+
+    @property
+    def scripts(self) -> frozenset[str]:
+        return self._scripts
+
+    @scripts.setter
+    def scripts(self, value: frozenset[str]) -> None:
+        self._scripts = _lowered(value)
+        self._results.clear()
+
+    @property
+    def dialogues(self) -> frozenset[str]:
+        return self._dialogues
+
+    @dialogues.setter
+    def dialogues(self, value: frozenset[str]) -> None:
+        self._dialogues = _lowered(value)
+        self._results.clear()
+
+    @property
+    def globals(self) -> frozenset[str]:
+        return self._globals
+
+    @globals.setter
+    def globals(self, value: frozenset[str]) -> None:
+        self._globals = _lowered(value)
+        self._results.clear()
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder, cache: ScriptCache | None = None) -> Linter:
+        """Create a linter that checks against the records of a load order."""
+        return Linter(
+            objects=(key for _, key in load_order.records if isinstance(key, str)),
+            scripts=(key for key in load_order.by_type(Script) if isinstance(key, str)),
+            dialogues=(key for key in load_order.by_type(Dialogue) if isinstance(key, str)),
+            globals=(key for key in load_order.by_type(GlobalVariable) if isinstance(key, str)),
+            cache=cache,
+        )
+
+    def lint(self, source: str, fragment: bool = False) -> list[Diagnostic]:
+        """Find the problems in a script, or in a `fragment` such as a dialogue result."""
+        return self.lint_many([source], fragment)[0]
+
+    def lint_many(
+        self,
+        sources: Iterable[str],
+        fragment: bool = False,
+        workers: int | None = None,
+    ) -> list[list[Diagnostic]]:
+        """Find the problems in many scripts, in the order of the given sources.
+
+        Sources that were already linted are not analysed again. When many sources need analysing
+        they are analysed on a pool of `workers` processes.
+        """
+        sources = list(sources)
+        keys = [_key(source, fragment) for source in sources]
+        missing = {key: source for key, source in zip(keys, sources) if key not in self._results}
+
+        if len(missing) < PARALLEL_THRESHOLD:
+            analysed = [self._analyse(source, fragment) for source in missing.values()]
+        else:
+            state = (self.objects, self.scripts, self.dialogues, self.globals)
+            chunk_size = max(1, len(missing) // (4 * (workers or os.cpu_count() or 1)))
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=state) as executor:
+                fragments = [fragment] * len(missing)
+                analysed = list(executor.map(_analyse, missing.values(), fragments, chunksize=chunk_size))
+
+        for key, (parsed, diagnostics) in zip(missing, analysed):
+            self._parses[key] = parsed
+            self._results[key] = diagnostics
+
+        return [self._results[key] for key in keys]
+
+    def lint_load_order(self, load_order: LoadOrder, workers: int | None = None) -> dict[str, list[Diagnostic]]:
+        """Find the problems in the scripts and dialogue results of a load order.
+
+        Scripts are keyed by their lowercased id, and dialogue results by their info id. Only
+        scripts with problems are included.
+        """
+        scripts = [(key, s.script_text) for key, s in load_order.by_type(Script).items() if s.script_text]
+        infos = [(key, i.script_text) for key, i in load_order.by_type(Info).items() if i.script_text]
+
+        results: dict[str, list[Diagnostic]] = {}
+        for items, fragment in ((scripts, False), (infos, True)):
+            diagnostics = self.lint_many([source for _, source in items], fragment, workers)
+            results.update((str(key), d) for (key, _), d in zip(items, diagnostics) if d)
+        return results
+
+    def parse(self, source: str, fragment: bool = False) -> ParsedScript:
+        """Parse a script, reusing the cached parse tree of an identical source."""
+        key = _key(source, fragment)
+        parsed = self._parses.get(key)
+        if parsed is None:
+            parsed = self._parses[key] = parse_script(source, fragment)
+        return parsed
+
+    def _analyse(self, source: str, fragment: bool) -> tuple[ParsedScript, list[Diagnostic]]:
+        parsed = self.parse(source, fragment)
+        diagnostics = list(parsed.errors)
+        returned_at = None  # the depth of the last `return`, until its block ends
+
+        for statement in parsed.statements:
+            keyword = statement.keyword
+            if returned_at is not None:
+                if keyword in BLOCK_ENDS and statement.depth < returned_at:
+                    returned_at = None
+                elif statement.depth >= returned_at and keyword not in BLOCK_ENDS:
+                    diagnostics.append(Diagnostic(statement.line, "unreachable-code", "statement after 'return'"))
+                    returned_at = None  # report each unreachable block once
+            if keyword == "return":
+                returned_at = statement.depth
+            elif keyword == "set":
+                diagnostics += self._check_set(statement, parsed, fragment)
+            else:
+                diagnostics += self._check_call(statement)
+
+        diagnostics.sort(key=lambda d: d.line)
+        return parsed, diagnostics
+
+    def _check_set(self, statement: Statement, parsed: ParsedScript, fragment: bool) -> list[Diagnostic]:
+        tokens = statement.tokens
+        if len(tokens) < 4 or tokens[2].text.lower() != "to":
+            return [Diagnostic(statement.line, "function-arguments", "expected 'set <variable> to <value>'")]
+
+        target = tokens[1].value.lower()
+        if "." in target:
+            ref = target.split(".", 1)[0]
+            if ref not in self.objects and ref not in BUILTIN_REFERENCES:
+                return [Diagnostic(statement.line, "unknown-object", f"unknown object '{ref}'")]
+        elif not fragment and target not in parsed.variables and target not in self.globals:
+            return [Diagnostic(statement.line, "undefined-variable", f"undefined variable '{tokens[1].value}'")]
+        return []
+
+    def _check_call(self, statement: Statement) -> list[Diagnostic]:
+        tokens = statement.tokens
+        diagnostics = []
+
+        for i, token in enumerate(tokens):
+            if token.text == "->" and i > 0:
+                ref = tokens[i - 1].value.lower()
+                if ref not in self.objects and ref not in BUILTIN_REFERENCES:
+                    diagnostics.append(Diagnostic(statement.line, "unknown-object", f"unknown object '{ref}'"))
+                continue
+
+            kinds = FUNCTIONS.get(token.text.lower()) if token.kind == "word" else None
+            if kinds is None:
+                continue
+
+            args = []
+            for arg in tokens[i + 1 :]:
+                if arg.kind == "operator" and arg.text != ",":
+                    break  # the end of the call within an expression
+                if arg.text != ",":
+                    args.append(arg)
+
+            # the number of arguments is only known for calls that make up a whole statement
+            if statement.keyword not in EXPRESSIONS and len(args) != len(kinds):
+                message = f"'{token.text}' expects {len(kinds)} arguments, got {len(args)}"
+                diagnostics.append(Diagnostic(statement.line, "function-arguments", message))
+
+            for arg, kind in zip(args, kinds):
+                known = {"object": self.objects, "script": self.scripts, "dialogue": self.dialogues}.get(kind)
+                value = arg.value.lower()
+                if known is not None and value not in known and value not in BUILTIN_REFERENCES:
+                    diagnostics.append(Diagnostic(statement.line, f"unknown-{kind}", f"unknown {kind} '{arg.value}'"))
+
+        return diagnostics
+
+
+def _lowered(ids: Iterable[str]) -> frozenset[str]:
+    return frozenset(s.lower() for s in ids)
+
+
+def _key(source: str, fragment: bool) -> bytes:
+    """Get the cache key of a source, which differs between scripts and fragments."""
+    return source_hash(source) + (b"f" if fragment else b"s")
+
+
+_worker: Linter | None = None
+
+
+def _init_worker(
+    objects: frozenset[str],
+    scripts: frozenset[str],
+    dialogues: frozenset[str],
+    globals: frozenset[str],
+) -> None:
+    global _worker
+    _worker = Linter(objects, scripts, dialogues, globals)
+
+
+def _analyse(source: str, fragment: bool) -> tuple[ParsedScript, list[Diagnostic]]:
+    return _worker._analyse(source, fragment)  # type: ignore[union-attr]
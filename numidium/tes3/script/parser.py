@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+__all__ = ["Diagnostic", "ParsedScript", "Statement", "Token", "parse_script", "strip_comment"]
+
+BEGIN = re.compile(r"begin\s+(\"[^\"]*\"|\S+)", re.IGNORECASE)
+DECLARATION = re.compile(r"(short|long|float)\s+(\"[^\"]*\"|\S+)", re.IGNORECASE)
+
+TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<string>"[^"]*"?)
+      | (?P<number>-?\d*\.?\d+)(?![^\s"<>=!+\-*/(),])
+      | (?P<operator>==|!=|<=|>=|->|[<>+\-*/(),])
+      | (?P<word>[^\s"<>=!+\-*/(),]+)
+    )
+    """,
+    re.VERBOSE,
+)
+
+# Statements that open, continue and close blocks.
+OPENERS = {"if": "endif", "while": "endwhile"}
+CONTINUATIONS = {"elseif", "else"}
+CLOSERS = {"endif", "endwhile"}
+
+
+class Token(NamedTuple):
+    kind: str  # "string", "number", "operator" or "word"
+    text: str
+
+    @property
+    def value(self) -> str:
+        """The text of the token, without quotes."""
+        return self.text.strip('"') if self.kind == "string" else self.text
+
+
+class Statement(NamedTuple):
+    line: int
+    tokens: tuple[Token, ...]
+    depth: int
+
+    @property
+    def keyword(self) -> str:
+        return self.tokens[0].text.lower()
+
+
+class Diagnostic(NamedTuple):
+    """A problem found in a script, with a short code such as `undefined-variable`."""
+
+    line: int
+    code: str
+    message: str
+
+
+class ParsedScript(NamedTuple):
+    """A script split into statements, with its declared variables and structural errors.
+
+    Attributes
+    ----------
+    name : str | None
+        The name given by the `begin` statement, or `None` for a fragment (e.g. a dialogue result).
+    variables : dict[str, str]
+        The kind (`short`, `long` or `float`) of each declared variable, by lowercased name.
+    statements : tuple[Statement, ...]
+        The statements of the script body, excluding declarations.
+    errors : tuple[Diagnostic, ...]
+        Errors in the block structure of the script.
+    """
+
+    name: str | None
+    variables: dict[str, str]
+    statements: tuple[Statement, ...]
+    errors: tuple[Diagnostic, ...]
+
+
+def tokenize(line: str) -> tuple[Token, ...]:
+    """Split a line of script source (without its comment) into tokens."""
+    tokens = []
+    for match in TOKEN.finditer(line):
+        kind = match.lastgroup
+        if kind is not None:
+            tokens.append(Token(kind, match[kind]))
+    return tuple(tokens)
+
+
+def parse_script(source: str, fragment: bool = False) -> ParsedScript:
+    """Parse a script source into statements.
+
+    A `fragment` has no `begin` and `end` statements, like the result scripts of dialogue.
+    """
+    name = None
+    variables: dict[str, str] = {}
+    statements = []
+    errors = []
+    blocks: list[tuple[str, int]] = []  # the closing keyword and opening line of each open block
+    begun, ended = fragment, False
+
+    for number, line in enumerate(source.splitlines(), 1):
+        line = strip_comment(line).strip()
+        tokens = tokenize(line)
+        if not tokens:
+            continue
+        keyword = tokens[0].text.lower()
+
+        if not begun:
+            begun = True
+            if match := BEGIN.fullmatch(line):
+                name = match[1].strip('"')
+                continue
+            errors.append(Diagnostic(number, "block-structure", "expected 'begin'"))
+        elif ended:
+            errors.append(Diagnostic(number, "unreachable-code", "statement after 'end'"))
+            continue
+
+        if match := DECLARATION.fullmatch(line):
+            variables.setdefault(match[2].strip('"').lower(), match[1].lower())
+        elif keyword == "end" and not fragment:
+            ended = True
+            _close_blocks(blocks, errors)
+        elif keyword in CLOSERS or keyword in CONTINUATIONS:
+            expected = "endif" if keyword in CONTINUATIONS else keyword
+            if blocks and blocks[-1][0] == expected:
+                statements.append(Statement(number, tokens, len(blocks) - 1))
+                if keyword in CLOSERS:
+                    blocks.pop()
+            else:
+                errors.append(Diagnostic(number, "block-structure", f"'{keyword}' without a matching block"))
+        else:
+            statements.append(Statement(number, tokens, len(blocks)))
+            if keyword in OPENERS:
+                blocks.append((OPENERS[keyword], number))
+
+    if not begun:
+        errors.append(Diagnostic(1, "block-structure", "expected 'begin'"))
+    elif not ended:
+        _close_blocks(blocks, errors)
+        if not fragment:
+            errors.append(Diagnostic(number, "block-structure", "expected 'end'"))
+
+    return ParsedScript(name, variables, tuple(statements), tuple(errors))
+
+
+def _close_blocks(blocks: list[tuple[str, int]], errors: list[Diagnostic]) -> None:
+    """Report the blocks that are still open at the end of a script."""
+    for closer, opened in blocks:
+        errors.append(Diagnostic(opened, "block-structure", f"block is never closed with '{closer}'"))
+    blocks.clear()
+
+
+def strip_comment(line: str) -> str:
+    """Remove a trailing comment from a line, ignoring semicolons within quotes."""
+    quoted = False
+    for i, c in enumerate(line):
+        if c == '"':
+            quoted = not quoted
+        elif c == ";" and not quoted:
+            return line[:i]
+    return line
@@ -0,0 +1,7 @@
+from .index import *
+
+__all__ = [
+    "PluginTextIndex",
+    "SearchHit",
+    "TextIndex",
+]
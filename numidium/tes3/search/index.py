@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Hashable, NamedTuple
+
+from numidium.config import CACHE_ROOT
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Book, Info, Plugin, Script
+from numidium.tes3.esp.object import TES3Object, wrapper_type
+from numidium.tes3.esp.records import record_key
+
+__all__ = ["PluginTextIndex", "SearchHit", "TextIndex"]
+
+RecordKey = tuple[type[TES3Object], Hashable]
+
+INDEX_VERSION = 1
+
+# The default directory the plugin indexes are persisted in.
+DEFAULT_CACHE_ROOT = CACHE_ROOT / "text"
+
+# The text fields that are indexed, by record type.
+FIELDS: dict[type[TES3Object], tuple[str, ...]] = {
+    Book: ("text",),
+    Info: ("text", "script_text"),
+    Script: ("script_text",),
+}
+
+TOKEN = re.compile(r"\w+")
+MARKUP = re.compile(r"<[^>]*>")  # the HTML-like tags of book text
+QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchHit(NamedTuple):
+    """A record whose text matched a query, with the plugin that supplied it."""
+
+    path: Path
+    type: type[TES3Object]
+    key: Hashable
+    field: str
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase words."""
+    return TOKEN.findall(text.lower())
+
+
+class PluginTextIndex:
+    """An inverted index of the text fields of a single plugin.
+
+    Attributes
+    ----------
+    documents : list[tuple[type[TES3Object], Hashable, str]]
+        The type, key and field of each indexed text.
+    postings : dict[str, dict[int, array[int]]]
+        The positions of each word within each document it appears in.
+    keys : set[RecordKey]
+        The type and key of every searchable record in the plugin, including those without text,
+        so that they hide the text of earlier plugins.
+    """
+
+    documents: list[tuple[type[TES3Object], Hashable, str]]
+    postings: dict[str, dict[int, array[int]]]
+    keys: set[RecordKey]
+
+    _vocabulary: list[str] | None
+
+    def __init__(self) -> None:
+        self.documents = []
+        self.postings = {}
+        self.keys = set()
+        self._vocabulary = None
+
+    def __getstate__(self) -> dict:
+        return {"documents": self.documents, "postings": self.postings, "keys": self.keys}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._vocabulary = None
+
+    @staticmethod
+    def from_plugin(plugin: Plugin) -> PluginTextIndex:
+        """Index the text fields of a plugin."""
+        index = PluginTextIndex()
+        for obj in plugin.by_types(*FIELDS):
+            ty, key = wrapper_type(obj), record_key(obj)
+            index.keys.add((ty, key))
+            if getattr(obj, "deleted", None) is not None:
+                continue
+            for field in FIELDS[ty]:
+                if text := getattr(obj, field):
+                    index.add(ty, key, field, MARKUP.sub(" ", text) if ty is Book else text)
+        return index
+
+    def add(self, ty: type[TES3Object], key: Hashable, field: str, text: str) -> None:
+        """Index the text of a record field."""
+        document = len(self.documents)
+        self.documents.append((ty, key, field))
+        for position, word in enumerate(tokenize(text)):
+            self.postings.setdefault(word, {}).setdefault(document, array("I")).append(position)
+        self._vocabulary = None
+
+    def match(self, query: str) -> set[int]:
+        """Find the documents that contain every term of a query.
+
+        Terms are words, `"quoted phrases"` whose words must appear in order, or `prefixes*`.
+        """
+        documents: set[int] | None = None
+        for phrase, word in QUERY.findall(query):
+            if word.endswith("*") and (prefix := word[:-1].lower()) and TOKEN.fullmatch(prefix):
+                found = self._match_prefix(prefix)
+            else:
+                found = self._match_phrase(tokenize(phrase or word))
+            documents = found if documents is None else documents & found
+            if not documents:
+                return set()
+        return documents or set()
+
+    def _match_phrase(self, words: list[str]) -> set[int]:
+        if not words:
+            return set()
+        postings = [self.postings.get(word, {}) for word in words]
+        documents = set(postings[0]).intersection(*postings[1:])
+        if len(words) == 1:
+            return documents
+        return {document for document in documents if _has_phrase([p[document] for p in postings])}
+
+    def _match_prefix(self, prefix: str) -> set[int]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        documents: set[int] = set()
+        for i in range(bisect_left(self._vocabulary, prefix), len(self._vocabulary)):
+            word = self._vocabulary[i]
+            if not word.startswith(prefix):
+                break
+            documents.update(self.postings[word])
+        return documents
+
+
+class TextIndex:
+    """A full-text index of the dialogue, books and scripts of a load order.
+
+    Each plugin is indexed separately, so that a changed plugin can be re-indexed on its own, and
+    the index of each plugin is persisted in `cache_root` until the plugin changes. By default
+    this is a directory in the user cache directory, and a `cache_root` of `None` disables it.
+    Only the text of the winning version of a record is found.
+
+    Attributes
+    ----------
+    paths : list[Path]
+        The paths of the indexed plugins, in load order.
+    indexes : list[PluginTextIndex]
+        The index of each plugin, in load order.
+    cache_root : Path | None
+        The directory the plugin indexes are persisted in, if any.
+    """
+
+    paths: list[Path]
+    indexes: list[PluginTextIndex]
+    cache_root: Path | None
+
+    _owners: dict[RecordKey, int] | None
+
+    def __init__(self, cache_root: str | Path | None = DEFAULT_CACHE_ROOT) -> None:
+        self.paths = []
+        self.indexes = []
+        self.cache_root = None if cache_root is None else Path(cache_root)
+        self._owners = None
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder, cache_root: str | Path | None = DEFAULT_CACHE_ROOT) -> TextIndex:
+        """Index the text of a load order, reusing the persisted indexes of unchanged plugins."""
+        index = TextIndex(cache_root)
+        for path, plugin in zip(load_order.paths, load_order.plugins):
+            index.update(path, plugin)
+        return index
+
+    def update(self, path: Path, plugin: Plugin) -> None:
+        """Index a plugin, replacing the index of a plugin with the same path if there is one.
+
+        New plugins are added to the end of the load order. A persisted index is only reused while
+        the size and modification time of the plugin file are unchanged, so a plugin edited in
+        memory should be saved before it is re-indexed.
+        """
+        path = Path(path)
+        plugin_index = self._load(path)
+        if plugin_index is None:
+            plugin_index = PluginTextIndex.from_plugin(plugin)
+            self._save(path, plugin_index)
+
+        if path in self.paths:
+            self.indexes[self.paths.index(path)] = plugin_index
+        else:
+            self.paths.append(path)
+            self.indexes.append(plugin_index)
+        self._owners = None
+
+    def search(self, query: str, limit: int | None = None) -> list[SearchHit]:
+        """Find the records whose text matches a query, in load order.
+
+        Terms are words, `"quoted phrases"` whose words must appear in order, or `prefixes*`, and
+        all of them must appear in the same field. Matching is case-insensitive.
+        """
+        owners = self._get_owners()
+        hits = []
+        for i, (path, plugin_index) in enumerate(zip(self.paths, self.indexes)):
+            for document in sorted(plugin_index.match(query)):
+                ty, key, field = plugin_index.documents[document]
+                if owners[(ty, key)] == i:
+                    hits.append(SearchHit(path, ty, key, field))
+                    if limit is not None and len(hits) >= limit:
+                        return hits
+        return hits
+
+    def _get_owners(self) -> dict[RecordKey, int]:
+        """Get the index of the last plugin to provide each record."""
+        if self._owners is None:
+            self._owners = {key: i for i, plugin_index in enumerate(self.indexes) for key in plugin_index.keys}
+        return self._owners
+
+    def _entry_path(self, path: Path) -> Path | None:
+        if self.cache_root is None:
+            return None
+        name = hashlib.blake2b(os.fsencode(path.resolve()), digest_size=16).hexdigest()
+        return self.cache_root / f"{name}.text"
+
+    def _load(self, path: Path) -> PluginTextIndex | None:
+        entry_path = self._entry_path(path)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path, "rb") as f:
+                entry = pickle.load(f)
+            stat = os.stat(path)
+            if entry["version"] != INDEX_VERSION or entry["stamp"] != (stat.st_size, stat.st_mtime_ns):
+                return None
+            plugin_index: PluginTextIndex = entry["index"]
+        except Exception:  # a missing, corrupt or incompatible entry
+            return None
+        return plugin_index
+
+    def _save(self, path: Path, plugin_index: PluginTextIndex) -> None:
+        entry_path = self._entry_path(path)
+        if entry_path is None:
+            return
+        try:
+            stat = os.stat(path)
+            entry = {"version": INDEX_VERSION, "stamp": (stat.st_size, stat.st_mtime_ns), "index": plugin_index}
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = entry_path.with_suffix(".tmp")
+            with open(temp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except OSError:  # the index is only persisted if the cache directory is writable
+            return
+
+
+def _has_phrase(positions: list[array[int]]) -> bool:
+    """Whether words appear at consecutive positions, given the positions of each word."""
+    following = [set(p) for p in positions[1:]]
+    return any(all(start + i in p for i, p in enumerate(following, 1)) for start in positions[0])
@@ -0,0 +1,12 @@
+from .heightmap import *
+from .references import *
+from .spatial import *
+
+__all__ = [
+    "Heightmap",
+    "LandscapeIndex",
+    "ReferenceIndex",
+    "ReferenceState",
+    "SpatialIndex",
+    "encode_png16",
+]
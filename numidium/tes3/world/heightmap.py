@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterable, Iterator, Mapping, cast
+
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Landscape
+from numidium.tes3.esp.object import TES3Object
+from numidium.tes3.esp.reader import RECORD_HEADER, decode_raw_records, iter_subrecords
+
+np: ModuleType | None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ["Heightmap", "LandscapeIndex", "encode_png16"]
+
+Grid = tuple[int, int]
+
+# The number of height samples along the edge of a cell, excluding the edge shared with its neighbor.
+CELL_SIZE = 64
+
+
+class LandscapeIndex(Mapping[Grid, Landscape]):
+    """The winning landscapes of the plugins at the given paths, located by grid and decoded on access.
+
+    Only the location of each landscape within its plugin is kept in memory. Deleted landscapes,
+    and landscapes without heights, hide the landscapes of earlier plugins.
+
+    Attributes
+    ----------
+    locations : dict[Grid, tuple[Path, int, int]]
+        The path, offset and size of the record of each landscape, by grid.
+    """
+
+    locations: dict[Grid, tuple[Path, int, int]]
+
+    _header: bytes
+
+    def __init__(self, paths: Iterable[str | Path]) -> None:
+        self.locations = {}
+        self._header = b""
+        for path in map(Path, paths):
+            self._scan(path)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __iter__(self) -> Iterator[Grid]:
+        return iter(self.locations)
+
+    def __getitem__(self, grid: Grid) -> Landscape:
+        landscape = self.decode([grid])[0]
+        if landscape is None:
+            raise KeyError(grid)
+        return landscape
+
+    def decode(self, grids: Iterable[Grid]) -> list[Landscape | None]:
+        """Decode the landscapes of the given grids together, or `None` for grids without one."""
+        grids = list(grids)
+        chunks = []
+        for grid in grids:
+            if (location := self.locations.get(grid)) is not None:
+                path, offset, size = location
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunks.append(f.read(size))
+        if not chunks:
+            return [None] * len(grids)
+
+        decoded = iter(zip(decode_raw_records([self._header, *chunks])[1:], chunks))
+        return [
+            cast(Landscape, TES3Object.wrap(*next(decoded))) if grid in self.locations else None
+            for grid in grids
+        ]  # fmt: skip
+
+    def _scan(self, path: Path) -> None:
+        """Locate the landscapes of a plugin, reading only the records of landscapes."""
+        with open(path, "rb") as f:
+            header = f.read(RECORD_HEADER.size)
+            header += f.read(RECORD_HEADER.unpack(header)[1])
+            self._header = self._header or header
+            offset = len(header)
+            while data := f.read(RECORD_HEADER.size):
+                tag, size, *_ = RECORD_HEADER.unpack(data)
+                location = (path, offset, RECORD_HEADER.size + size)
+                offset += RECORD_HEADER.size + size
+                if tag != b"LAND":
+                    f.seek(size, 1)
+                    continue
+
+                subrecords = dict(iter_subrecords(memoryview(data + f.read(size))))
+                if b"INTV" not in subrecords:
+                    continue
+                grid = cast(Grid, struct.unpack("<ii", subrecords[b"INTV"]))
+                if b"DELE" in subrecords or b"VHGT" not in subrecords:
+                    self.locations.pop(grid, None)
+                else:
+                    self.locations[grid] = location
+
+
+class Heightmap:
+    """A world heightmap assembled from the landscapes of exterior cells.
+
+    The map is built in horizontal strips of cells, from north to south, and only one strip is
+    assembled at a time. Landscapes streamed from plugins with `from_paths` are also only decoded
+    one strip at a time. Cells without a landscape are filled with `fill`. Requires NumPy.
+
+    Attributes
+    ----------
+    landscapes : Mapping[Grid, Landscape]
+        The landscape of each exterior cell, by grid.
+    fill : float
+        The height of cells that have no landscape, in game units.
+    """
+
+    landscapes: Mapping[Grid, Landscape]
+    fill: float
+
+    def __init__(self, landscapes: Mapping[Grid, Landscape], fill: float = -2048.0) -> None:
+        _numpy()
+        self.landscapes = landscapes
+        self.fill = fill
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder, fill: float = -2048.0) -> Heightmap:
+        """Build a heightmap from the winning landscapes of a load order."""
+        landscapes = {
+            cast(Grid, key): obj
+            for key, obj in load_order.by_type(Landscape).items()
+            if isinstance(obj, Landscape) and not obj.deleted and obj.vertex_heights is not None
+        }  # fmt: skip
+        return Heightmap(landscapes, fill)
+
+    @staticmethod
+    def from_paths(paths: Iterable[str | Path], fill: float = -2048.0) -> Heightmap:
+        """Build a heightmap from the winning landscapes of the plugins at the given paths, in load order.
+
+        Unlike `from_load_order` the plugins are not loaded: their landscapes are located with a
+        `LandscapeIndex`, and each strip of cells is decoded only when it is assembled.
+        """
+        return Heightmap(LandscapeIndex(paths), fill)
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int]:
+        """The grids of the south-west and north-east corners, as `(min_x, min_y, max_x, max_y)`.
+
+        Raises `ValueError` if there are no landscapes.
+        """
+        if not self.landscapes:
+            raise ValueError("The heightmap has no landscapes.")
+        xs = [x for x, _ in self.landscapes]
+        ys = [y for _, y in self.landscapes]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """The shape of the assembled heightmap, in samples."""
+        min_x, min_y, max_x, max_y = self.bounds
+        return (max_y - min_y + 1) * CELL_SIZE, (max_x - min_x + 1) * CELL_SIZE
+
+    def cell_heights(self, grid: Grid) -> Any:
+        """Get the heights of a cell, with north at the top and the shared edges excluded."""
+        return self._heights(self.landscapes.get(grid))
+
+    def strips(self, rows: int = 1, executor: Executor | None = None) -> Iterator[Any]:
+        """Iterate over horizontal strips of the heightmap, from north to south.
+
+        Each strip covers `rows` rows of cells, except possibly the last. If an executor is given
+        the heights of the cells of each strip are decoded on it.
+        """
+        np = _numpy()
+        min_x, min_y, max_x, max_y = self.bounds
+        xs = range(min_x, max_x + 1)
+        for top in range(max_y, min_y - 1, -rows):
+            grids = [(x, y) for y in range(top, max(top - rows, min_y - 1), -1) for x in xs]
+            if isinstance(self.landscapes, LandscapeIndex):
+                landscapes = self.landscapes.decode(grids)
+            else:
+                landscapes = [self.landscapes.get(grid) for grid in grids]
+            cells = list(
+                map(self._heights, landscapes) if executor is None else executor.map(self._heights, landscapes)
+            )
+            yield np.vstack([np.hstack(cells[i : i + len(xs)]) for i in range(0, len(cells), len(xs))])
+
+    def _heights(self, landscape: Landscape | None) -> Any:
+        np = _numpy()
+        if landscape is None:
+            return np.full((CELL_SIZE, CELL_SIZE), self.fill, dtype=np.float32)
+        heights = landscape.vertex_heights.heights()  # type: ignore[union-attr]
+        return heights[CELL_SIZE - 1 :: -1, :CELL_SIZE]
+
+    def assemble(self) -> Any:
+        """Assemble the whole heightmap into a single array, with north at the top."""
+        np = _numpy()
+        return np.vstack(list(self.strips(rows=8)))
+
+    def export_tiles(
+        self,
+        directory: str | Path,
+        tile_cells: int = 8,
+        levels: int = 4,
+        format: str = "png",
+        workers: int | None = None,
+    ) -> None:
+        """Export the heightmap as a pyramid of 16-bit tiles.
+
+        Tiles are `tile_cells * 64` samples wide. Level 0 tiles cover `tile_cells` by `tile_cells`
+        cells at full resolution, and each further level halves the resolution. Tiles are written
+        to `{directory}/{level}/{row}_{column}.{format}`, where `format` is either "png" or "raw"
+        (little-endian). Heights are stored in units of 8 game units, offset by 32768.
+
+        Strips of `tile_cells` rows of cells are assembled one at a time, so the whole heightmap is
+        never held in memory. The heights of the cells of each strip are decoded, and the tiles of
+        each level are encoded and written, on a thread pool of `workers` threads.
+        """
+        if format not in ("png", "raw"):
+            raise ValueError(f"Unsupported tile format: {format}")
+        np = _numpy()
+
+        directory = Path(directory)
+        for level in range(levels):
+            (directory / str(level)).mkdir(parents=True, exist_ok=True)
+
+        tile_size = tile_cells * CELL_SIZE
+        pending: list[Any | None] = [None] * levels  # partial strips of each level
+        row_counts = [0] * levels
+        futures: list[Future[None]] = []
+
+        with ThreadPoolExecutor(workers) as executor:
+
+            def write_row(level: int, strip: Any) -> None:
+                values = np.clip(np.rint(strip / 8) + 32768, 0, 65535).astype(np.uint16)
+                for column, left in enumerate(range(0, values.shape[1], tile_size)):
+                    path = directory / str(level) / f"{row_counts[level]}_{column}.{format}"
+                    futures.append(executor.submit(_write_tile, path, values[:, left : left + tile_size], format))
+                row_counts[level] += 1
+
+            def push(level: int, strip: Any | None, final: bool = False) -> None:
+                if level >= levels:
+                    return
+                buffer = pending[level]
+                if strip is not None:
+                    buffer = strip if buffer is None else np.vstack([buffer, strip])
+                while buffer is not None and (len(buffer) >= tile_size or (final and len(buffer))):
+                    row, buffer = buffer[:tile_size], (buffer[tile_size:] if len(buffer) > tile_size else None)
+                    write_row(level, row)
+                    push(level + 1, _downsample(row))
+                pending[level] = buffer
+                if final:
+                    push(level + 1, None, final=True)
+
+            for strip in self.strips(tile_cells, executor):
+                push(0, strip)
+            push(0, None, final=True)
+
+        for future in futures:
+            future.result()  # propagate any errors
+
+
+def _numpy() -> ModuleType:
+    """Get NumPy, which heightmaps require."""
+    if np is None:
+        raise ImportError("Heightmaps require NumPy.")
+    return np
+
+
+def _downsample(values: Any) -> Any:
+    """Halve the resolution of an array by averaging blocks of 2x2 samples."""
+    h, w = values.shape[0] // 2 * 2, values.shape[1] // 2 * 2
+    blocks = values[:h, :w].reshape(h // 2, 2, w // 2, 2)
+    return blocks.mean(axis=(1, 3))
+
+
+def _write_tile(path: Path, values: Any, format: str) -> None:
+    if format == "png":
+        path.write_bytes(encode_png16(values))
+    else:
+        path.write_bytes(values.astype("<u2").tobytes())
+
+
+def encode_png16(values: Any) -> bytes:
+    """Encode a 2D array of unsigned 16-bit values as a grayscale PNG. Requires NumPy."""
+    if np is None:
+        raise ImportError("Encoding 16-bit PNGs requires NumPy.")
+    height, width = values.shape
+    rows = np.zeros((height, 1 + width * 2), dtype=np.uint8)  # each row starts with filter type 0
+    rows[:, 1:] = np.ascontiguousarray(values, dtype=">u2").view(np.uint8).reshape(height, width * 2)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 16, 0, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])  # fmt: skip
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Hashable, Iterator, NamedTuple
+
+from numidium.logger import logger
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Cell, CellReferences, Plugin, Reference
+from numidium.tes3.esp.records import normalize_key, record_key
+
+__all__ = ["ReferenceIndex", "ReferenceState"]
+
+# A reference is identified across a load order by the file that created it and its index in that file.
+ReferenceKey = tuple[str, int]
+
+
+class ReferenceState(NamedTuple):
+    """Where a reference ends up once every plugin of a load order has been applied."""
+
+    cell: Hashable
+    position: tuple[float, float, float]
+    deleted: bool
+
+
+class ReferenceIndex:
+    """An index of the final state of every reference in a load order.
+
+    References are keyed by the lowercased name of the file that created them and their reference
+    index within that file, so that the same reference is matched across plugins regardless of the
+    master index each plugin uses for it. The cell of a reference is the key of the cell that lists
+    it (see `record_key`), or the key of the cell it was moved to.
+
+    Attributes
+    ----------
+    paths : list[Path]
+        The paths of the indexed plugins, in load order.
+    states : dict[ReferenceKey, ReferenceState]
+        The final state of each reference.
+    sources : dict[ReferenceKey, list[int]]
+        The indices of every plugin that touched a given reference, in load order.
+    """
+
+    paths: list[Path]
+    states: dict[ReferenceKey, ReferenceState]
+    sources: dict[ReferenceKey, list[int]]
+
+    _rows: dict[ReferenceKey, tuple[CellReferences, int]]
+
+    def __init__(self) -> None:
+        self.paths = []
+        self.states = {}
+        self.sources = {}
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __iter__(self) -> Iterator[ReferenceKey]:
+        return iter(self.states)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.states
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder) -> ReferenceIndex:
+        """Build the index of all references in a load order."""
+        index = ReferenceIndex()
+        for path, plugin in zip(load_order.paths, load_order.plugins):
+            index.append(path, plugin)
+        return index
+
+    def append(self, path: Path, plugin: Plugin) -> None:
+        """Apply the references of a plugin on top of the current index."""
+        source = len(self.paths)
+        self.paths.append(path)
+
+        files = [path.name.lower(), *(name.lower() for name, _ in plugin.objects[0].masters)]
+        for cell in plugin.by_type(Cell):
+            cell_key = record_key(cell)
+            references = cell.references
+            translations = references.translations
+            for row, (mast_index, refr_index) in enumerate(references):
+                if mast_index >= len(files):
+                    logger.warning("Reference with unknown master index: {} ({}, {})", path, mast_index, refr_index)
+                    continue
+
+                key = (files[mast_index], refr_index)
+                deleted = bool(references.deleted[row])
+                previous = self.states.get(key)
+                if deleted and previous is not None:
+                    position = previous.position  # deletions usually omit the placement
+                else:
+                    x, y, z = translations[row]
+                    position = (float(x), float(y), float(z))
+
+                moved_cell = references.moved_cells.get(row)
+                if isinstance(moved_cell, str):
+                    moved_cell = normalize_key(moved_cell)  # an interior cell, keyed by name
+                self.states[key] = ReferenceState(cell_key if moved_cell is None else moved_cell, position, deleted)
+                self.sources.setdefault(key, []).append(source)
+                self._rows[key] = (references, row)
+
+    def key(self, path: Path, plugin: Plugin, mast_index: int, refr_index: int) -> ReferenceKey:
+        """Get the load order key of a reference, as seen from the plugin at the given path."""
+        if mast_index == 0:
+            return path.name.lower(), refr_index
+        name, _ = plugin.objects[0].masters[mast_index - 1]
+        return name.lower(), refr_index
+
+    def get(self, key: ReferenceKey) -> ReferenceState | None:
+        """Get the final state of a reference."""
+        return self.states.get(_normalize(key))
+
+    def where(self, key: ReferenceKey) -> Hashable | None:
+        """Get the cell a reference ends up in, or `None` if it was deleted or does not exist."""
+        state = self.states.get(_normalize(key))
+        if state is None or state.deleted:
+            return None
+        return state.cell
+
+    def touched_by(self, key: ReferenceKey) -> list[Path]:
+        """Get the paths of the plugins that touch a reference, in load order."""
+        return [self.paths[i] for i in self.sources.get(_normalize(key), [])]
+
+    def reference(self, key: ReferenceKey) -> Reference:
+        """Get the winning version of a reference, decoding it if needed."""
+        references, row = self._rows[_normalize(key)]
+        return references.at(row)
+
+    def row(self, key: ReferenceKey) -> tuple[CellReferences, int]:
+        """Get the references of the cell listing the winning version of a reference, and its row."""
+        return self._rows[_normalize(key)]
+
+
+def _normalize(key: ReferenceKey) -> ReferenceKey:
+    name, refr_index = key
+    return name.lower(), refr_index
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable, Sequence
+
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import CellReferences, Reference
+from numidium.tes3.esp.object import TES3Object
+
+from .references import ReferenceIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+__all__ = ["SpatialIndex"]
+
+Grid = tuple[int, int]
+Point = Sequence[float]
+
+# The width of an exterior cell, in game units.
+CELL_UNITS = 8192.0
+
+
+class SpatialIndex:
+    """A uniform grid index of exterior references, with one bucket per exterior cell.
+
+    References are bucketed by their position rather than by the cell that contains them, so that
+    queries stay correct for references placed outside of their cell's bounds. Distances are
+    measured in all three dimensions. Requires NumPy.
+    """
+
+    _references: dict[Grid, list[Reference | tuple[CellReferences, int]]]
+    _positions: dict[Grid, np.ndarray]
+
+    def __init__(self, references: Iterable[Any]) -> None:
+        """Index the given references, which may be wrapped or native objects."""
+        entries = []
+        for ref in references:
+            if not isinstance(ref, TES3Object):
+                ref = TES3Object.wrap(ref)
+            entries.append((ref.translation, ref))
+        self._build(entries)
+
+    def __len__(self) -> int:
+        return sum(map(len, self._references.values()))
+
+    @staticmethod
+    def from_load_order(load_order: LoadOrder) -> SpatialIndex:
+        """Build an index of the references of all exterior cells in a load order.
+
+        References from later plugins replace the same reference from earlier ones, and deleted
+        references are excluded (see `ReferenceIndex`). References are only decoded once they are
+        returned by a query.
+        """
+        references = ReferenceIndex.from_load_order(load_order)
+        entries = [
+            (state.position, references.row(key))
+            for key, state in references.states.items()
+            if isinstance(state.cell, tuple) and not state.deleted  # exterior
+        ]  # fmt: skip
+
+        index = SpatialIndex.__new__(SpatialIndex)
+        index._build(entries)
+        return index
+
+    def radius(self, point: Point, radius: float) -> list[Reference]:
+        """Get all references within `radius` units of a point."""
+        px, py, _ = point
+        center = np.asarray(point, dtype=np.float32)
+        result = []
+        for grid in self._grids_between((px - radius, py - radius), (px + radius, py + radius)):
+            distances = np.sum((self._positions[grid] - center) ** 2, axis=1)
+            refs = self._references[grid]
+            result += [_resolve(refs[i]) for i in np.flatnonzero(distances <= radius * radius)]
+        return result
+
+    def box(self, minimum: Point, maximum: Point) -> list[Reference]:
+        """Get all references within the axis-aligned box between two corners."""
+        lower = np.asarray(minimum, dtype=np.float32)
+        upper = np.asarray(maximum, dtype=np.float32)
+        result = []
+        for grid in self._grids_between(minimum[:2], maximum[:2]):
+            positions = self._positions[grid]
+            inside = np.all((positions >= lower) & (positions <= upper), axis=1)
+            refs = self._references[grid]
+            result += [_resolve(refs[i]) for i in np.flatnonzero(inside)]
+        return result
+
+    def nearest(self, point: Point, count: int = 1) -> list[Reference]:
+        """Get the `count` references nearest to a point, nearest first.
+
+        Cells are searched in growing rings around the point, until no unsearched cell can contain
+        anything nearer than the candidates found so far.
+        """
+        if not self._references:
+            return []
+
+        px, py, _ = point
+        cx, cy = grid_of(px, py)
+        center = np.asarray(point, dtype=np.float32)
+        max_ring = max(max(abs(x - cx), abs(y - cy)) for x, y in self._references)
+
+        candidates: list[tuple[float, Any]] = []
+        for ring in range(max_ring + 1):
+            for grid in _ring(cx, cy, ring):
+                if (positions := self._positions.get(grid)) is not None:
+                    distances = np.sqrt(np.sum((positions - center) ** 2, axis=1))
+                    candidates += zip(distances.tolist(), self._references[grid])
+            candidates.sort(key=lambda c: c[0])
+            del candidates[count:]
+
+            # the nearest point that could lie outside of the searched cells
+            bound = min(
+                px - (cx - ring) * CELL_UNITS,
+                (cx + ring + 1) * CELL_UNITS - px,
+                py - (cy - ring) * CELL_UNITS,
+                (cy + ring + 1) * CELL_UNITS - py,
+            )
+            if len(candidates) == count and candidates[-1][0] <= bound:
+                break
+
+        return [_resolve(ref) for _, ref in candidates]
+
+    def duplicates(self, tolerance: float = 1.0) -> list[tuple[Reference, Reference]]:
+        """Get pairs of references with the same id placed within `tolerance` units of each other.
+
+        References are compared with the others in their cell, and with those of the neighbouring
+        cells that lie within `tolerance` units of the border between the two.
+        """
+        ids = {grid: np.array([_id(ref).lower() for ref in refs]) for grid, refs in self._references.items()}
+        reach = math.ceil(tolerance / CELL_UNITS)
+        result = []
+        for grid, refs in self._references.items():
+            positions = self._positions[grid]
+            for i in range(len(refs)):
+                distances = np.sum((positions[i + 1 :] - positions[i]) ** 2, axis=1)
+                matches = np.flatnonzero((distances <= tolerance * tolerance) & (ids[grid][i + 1 :] == ids[grid][i]))
+                result += [(_resolve(refs[i]), _resolve(refs[i + 1 + j])) for j in matches]
+
+            # each pair of neighbouring cells is only compared from the lower of the two
+            x, y = grid
+            for other in [(x + dx, y + dy) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)]:
+                if other <= grid or other not in self._references:
+                    continue
+                near = np.flatnonzero(_distance_to_cell(positions, other) <= tolerance)
+                other_positions = self._positions[other]
+                other_near = np.flatnonzero(_distance_to_cell(other_positions, grid) <= tolerance)
+                if not len(near) or not len(other_near):
+                    continue
+                other_refs = self._references[other]
+                for i in near:
+                    distances = np.sum((other_positions[other_near] - positions[i]) ** 2, axis=1)
+                    same_id = ids[other][other_near] == ids[grid][i]
+                    matches = other_near[(distances <= tolerance * tolerance) & same_id]
+                    result += [(_resolve(refs[i]), _resolve(other_refs[j])) for j in matches]
+        return result
+
+    def _build(self, entries: Iterable[tuple[Point, Any]]) -> None:
+        """Bucket entries of positions and references by grid."""
+        if np is None:
+            raise ImportError("Spatial indexes require NumPy.")
+        references: dict[Grid, list[Any]] = {}
+        positions: dict[Grid, list[Point]] = {}
+        for position, ref in entries:
+            grid = grid_of(position[0], position[1])
+            references.setdefault(grid, []).append(ref)
+            positions.setdefault(grid, []).append(position)
+        self._references = references
+        self._positions = {grid: np.array(points, dtype=np.float32) for grid, points in positions.items()}
+
+    def _grids_between(self, minimum: Point, maximum: Point) -> Iterable[Grid]:
+        """Get the grids of all non-empty buckets that overlap a rectangle."""
+        x0, y0 = grid_of(*minimum)
+        x1, y1 = grid_of(*maximum)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._references):
+            return [(x, y) for x, y in self._references if x0 <= x <= x1 and y0 <= y <= y1]
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in self._references]
+
+
+def grid_of(x: float, y: float) -> Grid:
+    """Get the grid of the exterior cell containing a position."""
+    return math.floor(x / CELL_UNITS), math.floor(y / CELL_UNITS)
+
+
+def _distance_to_cell(positions: np.ndarray, grid: Grid) -> np.ndarray:
+    """Get the horizontal distance from each position to the bounds of an exterior cell."""
+    lower = np.asarray(grid, dtype=np.float32) * CELL_UNITS
+    outside = np.maximum(lower - positions[:, :2], 0) + np.maximum(positions[:, :2] - (lower + CELL_UNITS), 0)
+    distances: np.ndarray = np.sqrt(np.sum(outside**2, axis=1))
+    return distances
+
+
+def _resolve(entry: Reference | tuple[CellReferences, int]) -> Reference:
+    """Get the reference of an entry, decoding it if it is still a row of its cell's references."""
+    if isinstance(entry, tuple):
+        references, row = entry
+        return references.at(row)
+    return entry
+
+
+def _id(entry: Reference | tuple[CellReferences, int]) -> str:
+    if isinstance(entry, tuple):
+        references, row = entry
+        return references.ids[row]
+    return entry.id
+
+
+def _ring(cx: int, cy: int, ring: int) -> Iterable[Grid]:
+    """Get the grids at exactly `ring` cells (in Chebyshev distance) from a grid."""
+    if ring == 0:
+        return [(cx, cy)]
+    top = [(x, cy + ring) for x in range(cx - ring, cx + ring + 1)]
+    bottom = [(x, cy - ring) for x in range(cx - ring, cx + ring + 1)]
+    left = [(cx - ring, y) for y in range(cy - ring + 1, cy + ring)]
+    right = [(cx + ring, y) for y in range(cy - ring + 1, cy + ring)]
+    return top + bottom + left + right
@@ -20,8 +20,11 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from numidium import tes3
+from numidium.config import CACHE_ROOT
 from numidium.logger import logger
 from numidium.tes3 import Plugin, dds
+from numidium.tes3.esp.cache import PluginCache
 from numidium.tes3.esp.object import TES3Object
 from numidium.ui.enums import AlignmentFlag
 from numidium.ui.widgets import ObjectTableModel
@@ -281,6 +284,9 @@ TABLE_INFO = {
 # fmt: on
 
 
+PLUGIN_CACHE = PluginCache(CACHE_ROOT / "plugins")
+
+
 class PluginViewer(ViewerItem):
     name: str = "Plugin Viewer"
 
@@ -319,7 +325,7 @@ class PluginViewer(ViewerItem):
         self.update_ui()
 
     def load_plugin(self, file: str, update_ui: bool = True) -> None:
-        self.plugin = Plugin.load(file)
+        self.plugin = Plugin.open(file, cache=PLUGIN_CACHE)
         if update_ui:
             self.update_ui()
 
@@ -336,9 +342,7 @@ class PluginViewer(ViewerItem):
 
         if object_type_info:
             header = object_type_info.header
-            values = [
-                object_type_info.get_field_values(obj) for obj in self.plugin.objects if obj.type_name == object_type
-            ]
+            values = [object_type_info.get_field_values(obj) for obj in self.plugin.by_type(getattr(tes3, object_type))]
 
         self.model = ObjectTableModel(self, values, header)
         self.object_table.setModel(self.model)
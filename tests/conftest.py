@@ -0,0 +1,34 @@
+import struct
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from numidium import tes3
+from numidium.tes3.esp.reader import encode_header
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
+
+
+def record(tag: bytes, *subrecords: tuple[bytes, bytes], flags1: int = 0, flags2: int = 0) -> bytes:
+    data = b"".join(struct.pack("<4sI", t, len(d)) + d for t, d in subrecords)
+    return struct.pack("<4sIII", tag, len(data), flags1, flags2) + data
+
+
+@pytest.fixture
+def write_plugin(tmp_path: Path) -> Callable[..., Path]:
+    """Return a function that writes a plugin with the given records to a temporary directory.
+
+    The plugin has the header of the test plugin, with the test plugin as its only master, so that
+    it patches the test plugin. Pass `patch=False` to keep the masters of the test plugin instead.
+    """
+
+    def write(name: str, *records: bytes, patch: bool = True) -> Path:
+        header = tes3.read_header(TEST_PLUGIN_PATH)
+        if patch:
+            header._wrapped.masters = [(TEST_PLUGIN_PATH.name, TEST_PLUGIN_PATH.stat().st_size)]
+        path = tmp_path / name
+        path.write_bytes(encode_header(header, len(records)) + b"".join(records))
+        return path
+
+    return write
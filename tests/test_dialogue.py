@@ -0,0 +1,118 @@
+import struct
+from pathlib import Path
+from typing import Callable
+
+from conftest import record
+
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.dialogue import DialogueIndex, FilterEvaluator, GameState, Speaker
+from numidium.tes3.esp import (
+    DialogueType,
+    FilterComparison,
+    FilterFunction,
+    FilterType,
+    Sex,
+)
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
+
+
+def info(info_id: str, prev_id: str, next_id: str, *subrecords: tuple[bytes, bytes]) -> bytes:
+    return record(
+        b"INFO",
+        (b"INAM", info_id.encode() + b"\0"),
+        (b"PNAM", prev_id.encode() + b"\0"),
+        (b"NNAM", next_id.encode() + b"\0"),
+        *subrecords,
+    )
+
+
+def test_dialogue_index(write_plugin: Callable[..., Path]) -> None:
+    patch_path = write_plugin(
+        "patch.esp",
+        record(b"DIAL", (b"NAME", b"test_dialogue\0"), (b"DATA", b"\0")),
+        info("1", "3451272801297428534", "2717620843215919047", (b"ONAM", b"test_npc\0")),
+        info("2717620843215919047", "1", "", (b"DELE", struct.pack("<I", 0))),
+        info("2", "", "3451272801297428534"),
+    )
+
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH, patch_path])
+    index = DialogueIndex.from_load_order(load_order)
+
+    assert len(index.topics) == 3
+    assert [i.info_id for i in index.topic("Test_Dial_Journal")] == [
+        "3159038603265019263",
+        "1729532392404917677",
+        "2041518983100002091",
+    ]
+    assert [i.info_id for i in index.topic("test_dialogue")] == ["2", "3451272801297428534", "1"]
+    assert index.get("2717620843215919047") is None
+    assert index.topic_of("1") is index.topics["test_dialogue"]
+    assert [(d.id, i.info_id) for d, i in index.by_speaker("Test_NPC")] == [("test_dialogue", "1")]
+    assert [i.info_id for _, i in index.by_speaker("a shady smuggler")] == ["3451272801297428534"]
+
+
+def info_data(disposition: int = 0) -> tuple[bytes, bytes]:
+    return b"DATA", struct.pack("<Iibbbx", DialogueType.Greeting.value, disposition, -1, Sex.Any.value, -1)
+
+
+def condition(
+    kind: FilterType,
+    id: str,
+    comparison: FilterComparison,
+    value: int,
+    function: FilterFunction | None = None,
+) -> list[tuple[bytes, bytes]]:
+    code = b"00" if function is None else function.value.to_bytes(2, "little")
+    return [(b"SCVR", b"0" + kind.value + code + comparison.value + id.encode()), (b"INTV", struct.pack("<i", value))]
+
+
+def test_filter_evaluator(write_plugin: Callable[..., Path]) -> None:
+    responses = {
+        "quest": [info_data(), *condition(FilterType.Journal, "Quest_A", FilterComparison.GreaterEqual, 10)],
+        "guard": [info_data(disposition=30), (b"CNAM", b"Guard\0")],
+        "local": [info_data(), *condition(FilterType.Local, "talked", FilterComparison.Equal, 1)],
+        "rich": [
+            info_data(),
+            *condition(FilterType.Function, "", FilterComparison.Greater, 1000, FilterFunction.Pcgold),
+        ],
+        "bob": [info_data(), (b"ONAM", b"Bob\0")],
+        "default": [info_data()],
+    }
+    ids = list(responses)
+
+    path = write_plugin(
+        "greetings.esp",
+        record(b"DIAL", (b"NAME", b"Greeting\0"), (b"DATA", bytes([DialogueType.Greeting.value]))),
+        *(
+            info(info_id, prev_id, next_id, *responses[info_id])
+            for prev_id, info_id, next_id in zip(["", *ids], ids, [*ids[1:], ""])
+        ),
+        patch=False,
+    )
+    load_order = LoadOrder()
+    load_order.extend([path])
+    index = DialogueIndex.from_load_order(load_order)
+
+    assert [i.info_id for i in index.topic("greeting")] == ids
+    evaluator = FilterEvaluator(index)
+
+    state = GameState()
+    guard = Speaker("guard_1", class_="guard", disposition=50)
+    bob = Speaker("bob")
+    assert evaluator.evaluate("Greeting", guard, state).info_id == "guard"
+    assert evaluator.evaluate("Greeting", guard._replace(disposition=10), state).info_id == "default"
+    assert evaluator.evaluate("Greeting", bob, state).info_id == "bob"
+
+    state.locals["bob"] = {"talked": 1}
+    state.functions[FilterFunction.Pcgold] = 5000
+    assert evaluator.evaluate("Greeting", bob, state).info_id == "local"
+    assert evaluator.evaluate("Greeting", Speaker("alice"), state).info_id == "rich"
+
+    state.journal["quest_a"] = 10
+    coverage = evaluator.coverage([guard, bob], state)
+    assert {key: info.info_id for key, info in coverage.items()} == {
+        ("greeting", "guard_1"): "quest",
+        ("greeting", "bob"): "quest",
+    }
@@ -0,0 +1,100 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from numidium import tes3
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.script import (
+    Linter,
+    ScriptCache,
+    ScriptError,
+    parse_declarations,
+    parse_declarations_many,
+    parse_load_order,
+)
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
+
+
+def test_parse_declarations() -> None:
+    script = tes3.Plugin.load(TEST_PLUGIN_PATH).by_type(tes3.Script)[0]
+
+    declarations = parse_declarations(script.script_text)
+    assert declarations.name == "test_script"
+    assert declarations.counts == (1, 1, 1)
+    assert declarations.variables == b"test_short\0test_long\0test_float\0"
+    assert declarations.matches(script)
+
+    source = 'Begin "my script" ; comment\nshort a\nfloat "b;c"\n  Long D\nset a to 1\nend'
+    assert parse_declarations(source) == ("my script", ("a",), ("D",), ("b;c",))
+    assert not parse_declarations(source).matches(script)
+
+    with pytest.raises(ScriptError, match="line 1"):
+        parse_declarations("short a\nbegin test\nend")
+    with pytest.raises(ScriptError, match="line 3"):
+        parse_declarations("begin test\nshort a\nlong A\nend")
+
+
+def test_parse_declarations_many() -> None:
+    sources = [f"begin script_{i}\nshort s_{i}\nend" for i in range(100)] + ["end"]
+
+    with TemporaryDirectory() as temp_dir:
+        cache = ScriptCache(Path(temp_dir) / "scripts.cache")
+        results = parse_declarations_many(sources, cache, workers=2)
+        assert [r.declarations.name for r in results[:-1]] == [f"script_{i}" for i in range(100)]
+        assert results[-1].declarations is None and results[-1].error.line == 1
+        cache.save()
+
+        cache = ScriptCache(Path(temp_dir) / "scripts.cache")
+        assert len(cache.entries) == 100
+        assert parse_declarations_many(sources[:-1], cache) == results[:-1]
+
+        load_order = LoadOrder()
+        load_order.extend([TEST_PLUGIN_PATH])
+        script = load_order.get(tes3.Script, "test_script")
+        result = parse_load_order(load_order, cache)["test_script"]
+        assert result.declarations.matches(script)
+
+
+LINT_SOURCE = """begin lint_test
+short count
+if ( player->GetItemCount "test_weapon" > 0 )
+    set count to 1
+    set missing to 2
+    return
+    StartScript test_script
+elseif ( unknown_ref->GetDisabled )
+    AddItem "no_such_item" 1
+    Journal test_dial_journal
+endif
+StartScript "Test_Script"
+endwhile
+end
+"""
+
+
+def test_linter() -> None:
+    linter = Linter(objects=["test_weapon", "test_script"], scripts=["test_script"], dialogues=["test_dial_journal"])
+    diagnostics = linter.lint(LINT_SOURCE)
+    assert [(d.line, d.code) for d in diagnostics] == [
+        (5, "undefined-variable"),
+        (7, "unreachable-code"),
+        (8, "unknown-object"),
+        (9, "unknown-object"),
+        (10, "function-arguments"),
+        (13, "block-structure"),
+    ]
+    assert linter.lint(LINT_SOURCE) is diagnostics  # cached
+
+    # the cached diagnostics are discarded when the known ids change
+    linter.objects = linter.objects | {"No_Such_Item"}
+    assert [d.line for d in linter.lint(LINT_SOURCE)] == [5, 7, 8, 10, 13]
+    linter.objects = linter.objects - {"no_such_item"}
+    assert linter.lint(LINT_SOURCE) == diagnostics
+
+    fragment = linter.lint("set missing to 1\nif ( x )\n", fragment=True)
+    assert fragment == [(2, "block-structure", "block is never closed with 'endif'")]
+
+    sources = [LINT_SOURCE.replace("lint_test", f"lint_test_{i}") for i in range(100)]
+    assert linter.lint_many(sources, workers=2) == [diagnostics] * 100
@@ -0,0 +1,55 @@
+from pathlib import Path
+from typing import Callable
+
+from conftest import record
+
+from numidium import tes3
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.search import SearchHit, TextIndex
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
+
+
+def test_text_index(tmp_path: Path, write_plugin: Callable[..., Path]) -> None:
+    patch_path = write_plugin(
+        "patch.esp",
+        record(b"DIAL", (b"NAME", b"test_dialogue\0"), (b"DATA", b"\0")),
+        record(b"INFO", (b"INAM", b"2717620843215919047\0"), (b"NAME", b"Come back with the Dwemer gear.\0")),
+    )
+
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH, patch_path])
+    cache_root = tmp_path / "text"
+    index = TextIndex.from_load_order(load_order, cache_root)
+
+    assert index.search("test_text") == [
+        SearchHit(TEST_PLUGIN_PATH, tes3.Book, "test_book", "text"),
+        SearchHit(TEST_PLUGIN_PATH, tes3.Book, "test_book_p", "text"),
+    ]
+    assert index.search('"short TEST_SHORT" dontsaveobject') == [
+        SearchHit(TEST_PLUGIN_PATH, tes3.Script, "test_script", "script_text"),
+    ]
+    assert index.search('"test_short short"') == []
+    assert [hit.key for hit in index.search("test_quest_*")] == [
+        "3159038603265019263",
+        "1729532392404917677",
+        "2041518983100002091",
+    ]
+    assert index.search("test_quest_* test_quest_f*") == index.search("test_quest_finish")
+    assert index.search("test_*", limit=2) == index.search("test_*")[:2]
+
+    # the patch overrides the response, hiding its original text
+    assert index.search("test_info") == []
+    assert index.search("dwemer gear") == [SearchHit(patch_path, tes3.Info, "2717620843215919047", "text")]
+
+    # the indexes are persisted, and only used until their plugin changes
+    assert len(list(cache_root.glob("*.text"))) == 2
+    cached = TextIndex.from_load_order(load_order, cache_root)
+    assert cached.search("dwemer*") == index.search("dwemer*")
+
+    write_plugin("patch.esp")
+    patch = tes3.Plugin.load(str(patch_path))
+    cached.update(patch_path, patch)
+    assert cached.paths == [TEST_PLUGIN_PATH, patch_path]
+    assert cached.search("dwemer") == []
+    assert [hit.path for hit in cached.search("test_info")] == [TEST_PLUGIN_PATH]
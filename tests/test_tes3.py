@@ -1,4 +1,20 @@
+import os
+import struct
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+import pytest
+from conftest import record
+
 from numidium import tes3
+from numidium.tes3.core import LoadOrder, MorrowindInstall
+from numidium.tes3.esp import landscape
+from numidium.tes3.esp.cache import PluginCache
+from numidium.tes3.esp.object import TES3Object
+from numidium.tes3.esp.reader import iter_subrecords, scan_records
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
 
 
 def test_load() -> None:
@@ -14,3 +30,391 @@ def test_load() -> None:
     assert header.description == ""
     assert header.num_objects == 79
     assert header.masters == [("Morrowind.esm", 79837557), ("Tribunal.esm", 4565686), ("Bloodmoon.esm", 9631798)]
+
+
+def test_load_lazy() -> None:
+    eager = tes3.Plugin.load("tests/assets/test.esp")
+    lazy = tes3.Plugin.load("tests/assets/test.esp", lazy=True)
+
+    assert len(lazy.objects) == len(eager.objects) == 80
+    assert [type(obj) for obj in lazy.objects] == [type(obj) for obj in eager.objects]
+
+    header = lazy.objects[0]
+    assert type(header) is tes3.Header
+    assert header.num_objects == 79
+
+
+def test_open_mmap() -> None:
+    with tes3.Plugin.open("tests/assets/test.esp", mmap=True) as plugin:
+        header = plugin.objects[0]
+        assert type(header) is tes3.Header
+        assert header.num_objects == 79
+
+        script = next(i for i, obj in enumerate(plugin.objects) if type(obj) is tes3.Script)
+        subrecords = dict(plugin.subrecords(script))
+        assert isinstance(subrecords[b"SCDT"], memoryview)
+        assert len(subrecords[b"SCDT"]) == len(plugin.objects[script].bytecode)
+        del subrecords
+
+
+def test_by_type() -> None:
+    for plugin in tes3.Plugin.load("tests/assets/test.esp"), tes3.Plugin.open("tests/assets/test.esp"):
+        assert plugin.count(tes3.Header) == 1
+        assert plugin.count(tes3.Info) == 7
+        assert plugin.count(tes3.Reference) == 0
+
+        infos = plugin.by_type(tes3.Info)
+        assert len(infos) == 7
+        assert all(type(obj) is tes3.Info for obj in infos)
+
+
+def test_get() -> None:
+    plugin = tes3.Plugin.open("tests/assets/test.esp")
+    weapon = plugin.by_type(tes3.Weapon)[0]
+
+    assert plugin.get(tes3.Weapon, weapon.id) is weapon
+    assert plugin.get(tes3.Weapon, weapon.id.upper()) is weapon
+    assert plugin.get(tes3.Npc, weapon.id) is None
+    assert plugin.get_many(tes3.Weapon, [weapon.id.lower(), "missing"]) == [weapon, None]
+
+
+def test_load_order() -> None:
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH, TEST_PLUGIN_PATH])
+
+    weapon = load_order.plugins[1].by_type(tes3.Weapon)[0]
+    assert load_order.get(tes3.Weapon, weapon.id.upper()) is weapon
+    assert load_order.source(tes3.Weapon, weapon.id) == TEST_PLUGIN_PATH
+    assert load_order.overridden(tes3.Weapon, weapon.id) == [TEST_PLUGIN_PATH]
+    assert load_order.get(tes3.Weapon, "missing") is None
+
+
+def test_load_many() -> None:
+    paths = [TEST_PLUGIN_PATH, "missing.esp", TEST_PLUGIN_PATH]
+    results = list(tes3.load_many(paths, workers=2))
+
+    assert [result.path for result in results] == list(map(str, paths))
+    assert results[0].plugin is not None and results[0].error is None
+    assert results[1].plugin is None and isinstance(results[1].error, Exception)
+    assert len(results[2].plugin.objects) == 80
+
+    # without workers the plugins are loaded one after another
+    assert [(r.path, r.error is None) for r in tes3.load_many(paths)] == [(r.path, r.error is None) for r in results]
+
+
+def test_install_load_order_paths(tmp_path: Path) -> None:
+    data_files = tmp_path / "Data Files"
+    data_files.mkdir()
+    mtimes = {"b.esp": 100, "a.esm": 300, "late.esm": 200, "c.esp": 50}
+    for name, mtime in mtimes.items():
+        path = data_files / name
+        path.write_bytes(b"")
+        os.utime(path, (mtime, mtime))
+
+    game_files = ["a.esm", "b.esp", "missing.esp", "c.esp", "late.esm"]
+    lines = ["[Game Files]", *(f"GameFile{i}={name}" for i, name in enumerate(game_files))]
+    (tmp_path / "Morrowind.ini").write_text("\r\n".join(lines) + "\r\n")
+
+    install = MorrowindInstall()
+    install.load(str(tmp_path))
+
+    # masters come before plugins, each sorted by timestamp, and missing files are skipped
+    assert [path.name for path in install.load_order_paths()] == ["late.esm", "a.esm", "c.esp", "b.esp"]
+
+
+def test_plugin_cache() -> None:
+    with TemporaryDirectory() as temp_dir:
+        cache = PluginCache(temp_dir, verify_hash=True)
+        assert cache.load(TEST_PLUGIN_PATH) is None
+
+        cold = tes3.Plugin.open(TEST_PLUGIN_PATH, cache=cache)
+        weapon_id = cold.by_type(tes3.Weapon)[0].id
+        assert cold.get(tes3.Weapon, weapon_id) is not None
+
+        records, keys = cache.load(TEST_PLUGIN_PATH)
+        assert len(records) == 80
+        assert weapon_id.lower() in keys[b"WEAP"]
+
+        warm = tes3.Plugin.open(TEST_PLUGIN_PATH, cache=cache)
+        assert warm.count(tes3.Info) == 7
+        assert warm.get(tes3.Weapon, weapon_id).id == weapon_id
+
+        # new ID indexes are appended to the entry
+        entry_path = cache._entry_path(TEST_PLUGIN_PATH)
+        size = entry_path.stat().st_size
+        info_id = warm.by_type(tes3.Info)[0].info_id
+        assert warm.get(tes3.Info, info_id) is not None
+        assert entry_path.stat().st_size > size
+        records, keys = cache.load(TEST_PLUGIN_PATH)
+        assert set(keys) == {b"WEAP", b"INFO"}
+        assert list(records) == list(tes3.Plugin.open(TEST_PLUGIN_PATH).objects.records)
+
+        # unreadable entries are misses
+        entry_path.write_bytes(entry_path.read_bytes()[:-3])
+        assert set(cache.load(TEST_PLUGIN_PATH)[1]) == {b"WEAP"}
+        entry_path.write_bytes(b"\x80\x05corrupt")
+        assert cache.load(TEST_PLUGIN_PATH) is None
+        assert tes3.Plugin.open(TEST_PLUGIN_PATH, cache=cache).count(tes3.Info) == 7
+
+        cache.max_size = 0
+        cache.evict()
+        assert cache.load(TEST_PLUGIN_PATH) is None
+
+
+def test_read_header() -> None:
+    header = tes3.read_header(TEST_PLUGIN_PATH)
+    expect = tes3.Plugin.load(TEST_PLUGIN_PATH).objects[0]
+
+    assert type(header) is tes3.Header
+    for name in header.annotations:
+        assert getattr(header, name) == getattr(expect, name)
+
+    results = list(tes3.read_headers([TEST_PLUGIN_PATH, "missing.esp", TEST_PLUGIN_PATH]))
+    assert [r.header.num_objects for r in results[::2]] == [79, 79]
+    assert results[1].header is None and isinstance(results[1].error, FileNotFoundError)
+
+
+def test_iter_records() -> None:
+    infos = list(tes3.iter_records(TEST_PLUGIN_PATH, types={tes3.Info}))
+    assert len(infos) == 7
+    assert all(type(obj) is tes3.Info for obj in infos)
+
+    references = list(tes3.iter_records(TEST_PLUGIN_PATH, types={tes3.Reference}))
+    cells = tes3.Plugin.load(TEST_PLUGIN_PATH).by_type(tes3.Cell)
+    assert len(references) == sum(len(cell.references) for cell in cells) > 0
+    assert all(type(obj) is tes3.Reference for obj in references)
+    assert len(list(tes3.iter_records(TEST_PLUGIN_PATH, types={tes3.Cell, tes3.Reference}))) == len(references) + 3
+
+    with pytest.raises(ValueError, match="CellData"):
+        list(tes3.iter_records(TEST_PLUGIN_PATH, types={tes3.CellData}))
+
+    records = list(tes3.iter_records(TEST_PLUGIN_PATH, batch_size=1))
+    assert [type(obj) for obj in records] == [type(obj) for obj in tes3.Plugin.load(TEST_PLUGIN_PATH).objects]
+
+
+def test_save() -> None:
+    plugin = tes3.Plugin.open(TEST_PLUGIN_PATH)
+    infos = plugin.by_type(tes3.Info)
+
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "test.esp"
+
+        # unmodified records are copied through as-is
+        plugin.save(path)
+        assert path.read_bytes() == TEST_PLUGIN_PATH.read_bytes()
+
+        # the header is re-encoded with the new record count
+        tes3.Plugin([plugin.objects[0], *infos]).save(path)
+        assert tes3.read_header(path).num_objects == len(infos)
+        assert tes3.Plugin.open(path).count(tes3.Info) == len(infos)
+
+        # eagerly loaded records keep their original bytes too
+        tes3.Plugin.load(TEST_PLUGIN_PATH).save(path)
+        assert path.read_bytes() == TEST_PLUGIN_PATH.read_bytes()
+
+        # edits to nested objects are only found when verifying
+        weapon = plugin.by_type(tes3.Weapon)[0]
+        weapon.data.weight += 1
+        assert not weapon.modified
+        plugin.save(path)
+        assert path.read_bytes() == TEST_PLUGIN_PATH.read_bytes()
+        with pytest.raises(ValueError, match="test_weapon"):
+            plugin.save(path, verify=True)
+
+        # modified records cannot be encoded
+        weapon.name = "renamed"
+        with pytest.raises(ValueError, match="Weapon 'test_weapon'"):
+            plugin.save(path)
+
+
+def test_fields() -> None:
+    plugin = tes3.Plugin.open(TEST_PLUGIN_PATH)
+    weapon = plugin.by_type(tes3.Weapon)[0]
+
+    assert isinstance(vars(tes3.Weapon)["id"], property)
+    assert weapon.id == weapon._wrapped.id
+    assert not weapon.modified
+
+    weapon.name = "Renamed"
+    assert weapon._wrapped.name == "Renamed"
+    assert weapon.modified
+
+
+def test_load_unwrapped() -> None:
+    plugin = tes3.Plugin.load(TEST_PLUGIN_PATH, wrap=False)
+    weapon = plugin.by_type(tes3.Weapon)[0]
+
+    assert not isinstance(weapon, tes3.Weapon)
+    assert plugin.count(tes3.Info) == 7
+    assert plugin.get(tes3.Weapon, weapon.id.upper()) is weapon
+    assert type(TES3Object.wrap(weapon)) is tes3.Weapon
+
+    with pytest.raises(ValueError, match="wrap=True"):
+        plugin.save("unused.esp")
+    with pytest.raises(ValueError, match="Lazy"):
+        tes3.Plugin.load(TEST_PLUGIN_PATH, lazy=True, wrap=False)
+
+
+def test_to_columns() -> None:
+    plugin = tes3.Plugin.open(TEST_PLUGIN_PATH)
+    weapons = plugin.by_type(tes3.Weapon)
+
+    table = plugin.to_columns(tes3.Weapon, ["id", "data.weight", "data.value"])
+    assert len(table) == len(weapons)
+    assert list(table["id"]) == [w.id for w in weapons]
+    assert list(table["data.value"]) == [w.data.value for w in weapons]
+
+    heaviest = table.sort("data.weight", reverse=True)
+    assert heaviest.records[0].data.weight == max(w.data.weight for w in weapons)
+
+    cheap = table.filter([value < 100 for value in table["data.value"]])
+    assert all(w.data.value < 100 for w in cheap.records)
+    assert table.missing == {}
+
+    # missing integers are stored as 0, and recorded as missing
+    weapons[0].data = None
+    table = plugin.to_columns(tes3.Weapon, ["data.value"]).sort("data.value")
+    assert table["data.value"][0] == 0
+    assert list(table.missing["data.value"]) == [True] + [False] * (len(weapons) - 1)
+
+
+def test_vertex_heights(monkeypatch: pytest.MonkeyPatch) -> None:
+    np = pytest.importorskip("numpy")
+
+    eager = tes3.Plugin.load(TEST_PLUGIN_PATH).by_type(tes3.Landscape)[0].vertex_heights
+    lazy = tes3.Plugin.open(TEST_PLUGIN_PATH).by_type(tes3.Landscape)[0].vertex_heights
+
+    assert type(lazy) is tes3.VertexHeights
+    assert lazy.data.shape == (65, 65)
+    assert lazy.data.dtype == np.int8
+    assert not lazy.data.flags.owndata  # zero-copy view
+    assert np.array_equal(lazy.data, eager.data)
+
+    heights = lazy.heights()
+    deltas = np.asarray(eager._wrapped.data, dtype=np.float64).reshape(65, 65)
+    assert heights[0, 0] == (eager.offset + deltas[0, 0]) * 8
+    assert heights[1, 2] == (eager.offset + deltas[0, 0] + deltas[1, 0] + deltas[1, 1] + deltas[1, 2]) * 8
+
+    # the heights are decoded without NumPy too
+    monkeypatch.setattr(landscape, "np", None)
+    assert np.array_equal(lazy.heights(), heights)
+    assert np.array_equal(TES3Object.wrap(eager._wrapped).heights(), heights)  # decoded list
+    monkeypatch.undo()
+
+    # the vertex data can be assigned like other fields
+    landscape_record = tes3.Plugin.open(TEST_PLUGIN_PATH).by_type(tes3.Landscape)[0]
+    landscape_record.vertex_heights = eager
+    assert landscape_record.modified
+    assert landscape_record._wrapped.vertex_heights is eager._wrapped
+    landscape_record.vertex_heights = None
+    assert landscape_record.vertex_heights is None
+
+
+def test_cell_references() -> None:
+    eager = tes3.Plugin.load(TEST_PLUGIN_PATH).by_type(tes3.Cell)[-1].references
+    lazy = tes3.Plugin.open(TEST_PLUGIN_PATH).by_type(tes3.Cell)[-1].references
+
+    assert isinstance(lazy, tes3.CellReferences)
+    assert len(lazy) == len(eager) > 0
+    assert list(lazy) == list(eager)
+    assert lazy.ids == eager.ids
+    assert list(lazy.deleted) == list(eager.deleted)
+    assert lazy._native is None  # nothing decoded yet
+
+    key = next(iter(lazy))
+    assert key in lazy and (255, 0xFFFFFF) not in lazy
+    ref = lazy[key]
+    assert type(ref) is tes3.Reference
+    assert (ref.mast_index, ref.refr_index) == key
+    assert ref.id == lazy.ids[lazy.row(key)]
+    assert lazy[key] is ref
+    assert [float(v) for v in lazy.translations[0]] == pytest.approx(ref.translation)
+
+
+def test_diff(write_plugin: Callable[..., Path]) -> None:
+    data = TEST_PLUGIN_PATH.read_bytes()
+    records = []
+    for raw in list(scan_records(data))[1:]:
+        subrecords = [(tag, bytes(view)) for tag, view in iter_subrecords(memoryview(data)[raw.offset : raw.end])]
+        if subrecords[0] == (b"NAME", b"test_activator\0"):
+            continue
+        if subrecords[0] == (b"NAME", b"test_weapon\0"):
+            subrecords[2] = (b"FNAM", b"renamed\0")
+        if raw.tag == b"CELL" and (b"NAME", b"test_interior\0") in subrecords:
+            i = [tag for tag, _ in subrecords].index(b"FRMR")
+            i += [tag for tag, _ in subrecords[i:]].index(b"DATA")
+            subrecords[i] = (b"DATA", struct.pack("<6f", 1, 2, 3, 0, 0, 0))
+        records.append(record(raw.tag, *subrecords, flags1=raw.flags1, flags2=raw.flags2))
+    records.append(record(b"STAT", (b"NAME", b"test_new_static\0"), (b"MODL", b"editormarker.nif\0")))
+
+    path = write_plugin("changed.esp", *records, patch=False)
+    result = tes3.diff(TEST_PLUGIN_PATH, path)
+
+    assert [(c.type, c.key) for c in result.added] == [(tes3.Static, "test_new_static")]
+    assert [(c.type, c.key) for c in result.removed] == [(tes3.Activator, "test_activator")]
+
+    weapon, cell, reference = result.changed
+    assert (weapon.type, weapon.key) == (tes3.Weapon, "test_weapon")
+    assert weapon.fields == (("name", "test_name", "renamed"),)
+    assert (cell.type, cell.key, cell.fields) == (tes3.Cell, "test_interior", ())
+    assert reference.type is tes3.Reference and reference.key[0] == "test_interior"
+    assert [change.field for change in reference.fields] == ["translation"]
+    assert reference.new.translation == [1, 2, 3]
+
+    assert tes3.diff(TEST_PLUGIN_PATH, tes3.Plugin.load(str(TEST_PLUGIN_PATH))) == ([], [], [])
+
+
+def test_diff_duplicates_and_moves(write_plugin: Callable[..., Path]) -> None:
+    def static(model: str) -> bytes:
+        return record(b"STAT", (b"NAME", b"test_static\0"), (b"MODL", model.encode() + b"\0"))
+
+    def cell(name: str, *references: int) -> bytes:
+        subrecords = [(b"NAME", name.encode() + b"\0"), (b"DATA", struct.pack("<Iii", 1, 0, 0))]
+        for refr_index in references:
+            subrecords += [
+                (b"FRMR", struct.pack("<I", refr_index)),
+                (b"NAME", b"test_static\0"),
+                (b"DATA", struct.pack("<6f", refr_index, 0, 0, 0, 0, 0)),
+            ]
+        return record(b"CELL", *subrecords)
+
+    old = write_plugin("old.esp", static("a.nif"), static("b.nif"), static("c.nif"), cell("A", 1, 2), cell("B"))
+    new = write_plugin("new.esp", static("a.nif"), static("d.nif"), cell("A", 1), cell("B", 2), patch=False)
+    result = tes3.diff(old, new)
+
+    # the duplicates that differ are matched in order, and the extra one is removed
+    assert [(c.key, c.old.mesh) for c in result.removed] == [("test_static", "c.nif")]
+    assert result.added == []
+    header, static_change, cell_a, cell_b, moved = result.changed
+    assert header.type is tes3.Header
+    assert static_change.fields == (("mesh", "b.nif", "d.nif"),)
+    assert [cell_a.key, cell_b.key] == ["a", "b"]
+
+    # a reference moved to another cell is a single change
+    assert (moved.type, moved.key) == (tes3.Reference, ("b", 0, 2))
+    assert moved.fields == (("cell", "a", "b"),)
+
+
+def test_fingerprints() -> None:
+    plugin = tes3.Plugin.open(TEST_PLUGIN_PATH)
+    fingerprints = plugin.fingerprints()
+    assert len(fingerprints) == 80 and all(fingerprints)
+    assert plugin.objects._objects == [None] * 80  # nothing decoded
+    assert list(tes3.Plugin.open(TEST_PLUGIN_PATH).fingerprints()) == list(fingerprints)
+
+    weapon, weapon_p = plugin.by_type(tes3.Weapon)
+    i = plugin.objects.index(weapon)
+    assert weapon.fingerprint == fingerprints[i] != weapon_p.fingerprint
+    assert weapon.fingerprint is weapon.fingerprint  # memoized
+
+    weapon.name = "renamed"
+    assert weapon.fingerprint is None
+    assert plugin.fingerprints()[i] == 0
+    assert list(tes3.Plugin.load(str(TEST_PLUGIN_PATH)).fingerprints()) == list(
+        tes3.Plugin.open(TEST_PLUGIN_PATH).fingerprints()
+    )
+
+    # eagerly loaded records have the same fingerprints, so diff skips them without decoding
+    lazy = tes3.Plugin.open(TEST_PLUGIN_PATH)
+    assert tes3.diff(lazy, tes3.Plugin.load(str(TEST_PLUGIN_PATH))) == ([], [], [])
+    assert lazy.objects._objects == [None] * 80
@@ -0,0 +1,146 @@
+import struct
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+import pytest
+from conftest import record
+
+from numidium import tes3
+from numidium.tes3.core import LoadOrder
+from numidium.tes3.esp import Reference
+
+np = pytest.importorskip("numpy")
+
+from numidium.tes3.world import (  # noqa: E402
+    Heightmap,
+    LandscapeIndex,
+    ReferenceIndex,
+    SpatialIndex,
+)
+
+TEST_PLUGIN_PATH = Path("tests/assets/test.esp")
+
+
+def test_heightmap() -> None:
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH], lazy=True)
+
+    heightmap = Heightmap.from_load_order(load_order)
+    (grid, landscape), *_ = heightmap.landscapes.items()
+    assert heightmap.bounds == (*grid, *grid)
+
+    heights = heightmap.assemble()
+    assert heights.shape == heightmap.shape == (64, 64)
+    assert np.array_equal(heights[::-1], landscape.vertex_heights.heights()[:64, :64])
+
+    # streamed landscapes are only located up front, and decoded as they are needed
+    streamed = Heightmap.from_paths([TEST_PLUGIN_PATH])
+    assert isinstance(streamed.landscapes, LandscapeIndex)
+    assert streamed.landscapes.keys() == heightmap.landscapes.keys()
+    assert streamed.landscapes[grid].grid == grid
+    assert streamed.landscapes.decode([grid, (100, 100)])[1] is None
+    assert np.array_equal(streamed.assemble(), heights)
+
+    with pytest.raises(ValueError, match="no landscapes"):
+        Heightmap({}).bounds
+
+    with TemporaryDirectory() as temp_dir:
+        heightmap.export_tiles(temp_dir, tile_cells=1, levels=2)
+        assert (Path(temp_dir) / "0" / "0_0.png").read_bytes().startswith(b"\x89PNG")
+        assert (Path(temp_dir) / "1" / "0_0.png").exists()
+
+        heightmap.export_tiles(temp_dir, tile_cells=1, levels=1, format="raw")
+        raw = np.frombuffer((Path(temp_dir) / "0" / "0_0.raw").read_bytes(), dtype="<u2").reshape(64, 64)
+        assert np.array_equal(raw, np.rint(heights / 8) + 32768)
+
+
+def place_references(*positions: tuple[float, float, float]) -> list[Reference]:
+    """Move references of the interior cell of the test plugin to the given positions."""
+    cell = tes3.Plugin.load(TEST_PLUGIN_PATH).get(tes3.Cell, "test_interior")
+    references = list(cell.references.values())[: len(positions)]
+    for ref, position in zip(references, positions):
+        ref.translation = list(position)
+    return references
+
+
+def test_spatial_index() -> None:
+    a, b, c, d = place_references(
+        (100.0, 100.0, 0.0),
+        (8300.0, 100.0, 0.0),  # just across the cell border
+        (-20000.0, 5000.0, 300.0),
+        (100.5, 100.0, 0.0),
+    )
+    d.id = a.id  # a duplicate of a
+    index = SpatialIndex([a, b, c, d])
+    assert len(index) == 4
+
+    assert index.radius((0.0, 0.0, 0.0), 200.0) == [a, d]
+    assert set(index.radius((4000.0, 100.0, 0.0), 4500.0)) == {a, b, d}
+    assert index.box((8000.0, 0.0, -1.0), (9000.0, 200.0, 1.0)) == [b]
+    assert index.box((-30000.0, 0.0, 0.0), (0.0, 10000.0, 100.0)) == []
+
+    assert index.nearest((8150.0, 100.0, 0.0)) == [b]
+    assert index.nearest((8100.0, 100.0, 0.0), count=2) == [b, d]
+    assert index.nearest((50000.0, 50000.0, 0.0), count=10)[-1] is c
+    assert index.duplicates() == [(a, d)]
+
+    # duplicates on either side of a cell border
+    e, f, g = place_references((8191.9, 100.0, 0.0), (8192.1, 100.0, 0.0), (8191.8, -0.5, 0.0))
+    f.id = g.id = e.id
+    assert SpatialIndex([e, f]).duplicates() == [(e, f)]
+    assert SpatialIndex([e, f]).duplicates(tolerance=0.1) == []
+    assert len(SpatialIndex([f, g]).duplicates(tolerance=101.0)) == 1  # diagonal neighbours
+
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH], lazy=True)
+    assert len(SpatialIndex.from_load_order(load_order)) == 0  # only interior cells have references
+
+
+def test_reference_index(write_plugin: Callable[..., Path]) -> None:
+    (_, a), (_, b), (_, c), *_ = tes3.Plugin.open(TEST_PLUGIN_PATH).get(tes3.Cell, "test_interior").references
+
+    # a plugin that deletes one reference of the test plugin, moves another to an exterior cell,
+    # and a third to another interior cell
+    patch_path = write_plugin(
+        "patch.esp",
+        record(
+            b"CELL",
+            (b"NAME", b"test_interior\0"),
+            (b"DATA", struct.pack("<Iii", 1, 0, 0)),
+            (b"FRMR", struct.pack("<I", 1 << 24 | a)),
+            (b"NAME", b"test_npc\0"),
+            (b"DELE", struct.pack("<I", 0)),
+            (b"MVRF", struct.pack("<I", 1 << 24 | b)),
+            (b"CNDT", struct.pack("<ii", 2, 3)),
+            (b"FRMR", struct.pack("<I", 1 << 24 | b)),
+            (b"NAME", b"test_creature\0"),
+            (b"DATA", struct.pack("<6f", 16500.0, 24700.0, 0.0, 0.0, 0.0, 0.0)),
+            (b"MVRF", struct.pack("<I", 1 << 24 | c)),
+            (b"CNAM", b"Test Elsewhere\0"),
+            (b"FRMR", struct.pack("<I", 1 << 24 | c)),
+            (b"NAME", b"test_npc\0"),
+            (b"DATA", struct.pack("<6f", 1.0, 2.0, 3.0, 0.0, 0.0, 0.0)),
+        ),
+    )
+
+    load_order = LoadOrder()
+    load_order.extend([TEST_PLUGIN_PATH, patch_path], lazy=True)
+    index = ReferenceIndex.from_load_order(load_order)
+
+    key_a = (TEST_PLUGIN_PATH.name, a)
+    assert index.get(key_a).deleted
+    assert index.where(key_a) is None
+    assert index.touched_by(key_a) == [TEST_PLUGIN_PATH, patch_path]
+    assert index.key(patch_path, load_order.plugins[1], 1, a) == (TEST_PLUGIN_PATH.name.lower(), a)
+
+    key_b = (TEST_PLUGIN_PATH.name.upper(), b)
+    assert index.where(key_b) == (2, 3)
+    assert index.get(key_b).position == (16500.0, 24700.0, 0.0)
+    assert index.reference(key_b).refr_index == b
+
+    assert index.where((TEST_PLUGIN_PATH.name, c)) == "test elsewhere"
+
+    spatial = SpatialIndex.from_load_order(load_order)
+    assert len(spatial) == 1
+    assert [ref.refr_index for ref in spatial.nearest((0.0, 0.0, 0.0))] == [b]
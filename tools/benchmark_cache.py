@@ -0,0 +1,32 @@
+"""Compare opening plugins lazily without a cache, with a cold cache and with a warm cache.
+
+Usage: python tools/benchmark_cache.py PLUGIN...
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from tempfile import TemporaryDirectory
+
+from numidium.tes3.esp import Plugin
+from numidium.tes3.esp.cache import PluginCache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--mmap", action="store_true")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        cache = PluginCache(temp_dir)
+        for label, plugin_cache in (("no cache", None), ("cold cache", cache), ("warm cache", cache)):
+            start = time.perf_counter()
+            for path in args.paths:
+                Plugin.open(path, args.mmap, plugin_cache).close()
+            print(f"{label + ':':12}{time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare reading record fields through wrapper properties, `__getattr__` and the native objects.
+
+Usage: python tools/benchmark_fields.py [--number N] [--fields N] PLUGIN
+
+Every annotated field of a wrapper has a property that reads it with a C-level `attrgetter`. The
+`__getattr__` row times the fallback the wrappers used before, which first fails a normal lookup,
+and the native row times reading the wrapped object directly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Any
+
+from numidium.tes3.esp import Plugin
+
+
+class Fallback:
+    """A wrapper that forwards every field read through `__getattr__`."""
+
+    __slots__ = ("_wrapped",)
+
+    def __init__(self, wrapped: Any) -> None:
+        self._wrapped = wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._wrapped, name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--fields", type=int, default=1000, help="the number of fields to read")
+    args = parser.parse_args()
+
+    objects = Plugin.load(args.path).objects
+    fields = [
+        (obj, field)
+        for obj in objects
+        for field in type(obj).__annotations__
+        if not field.startswith("_") and isinstance(getattr(type(obj), field, None), property)
+    ][: args.fields]
+    wrapped = [(obj._wrapped, field) for obj, field in fields]
+    fallback = [(Fallback(obj._wrapped), field) for obj, field in fields]
+    if not fields:
+        parser.error("the plugin has no records with fields")
+
+    number: int = args.number
+
+    def read(pairs: list[tuple[Any, str]]) -> float:
+        total = 0.0
+        for obj, field in pairs:
+            total += min(timeit.repeat(f"obj.{field}", globals={"obj": obj}, number=number, repeat=3))
+        return total / (number * len(pairs))
+
+    print(f"{len(fields)} fields")
+    for label, pairs in (("property", fields), ("__getattr__", fallback), ("native", wrapped)):
+        print(f"{label + ':':<13}{read(pairs) * 1e9:5.0f} ns per field read")
+
+
+if __name__ == "__main__":
+    main()
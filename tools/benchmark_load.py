@@ -0,0 +1,45 @@
+"""Compare loading plugins one after another with loading them on threads through `load_many`.
+
+Usage: python tools/benchmark_load.py [--workers N] [--lazy] PLUGIN...
+
+A speed-up close to the number of workers means the native loader releases the GIL, while a
+speed-up close to 1 means the loads are serialized and only file reads overlap.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from numidium.tes3.esp import Plugin, load_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--lazy", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    serial = concurrent = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for path in args.paths:
+            Plugin.load(path, args.lazy)
+        serial = min(serial, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for result in load_many(args.paths, args.workers, args.lazy):
+            if result.error is not None:
+                raise result.error
+        concurrent = min(concurrent, time.perf_counter() - start)
+
+    print(f"serial:     {serial:.3f}s")
+    print(f"concurrent: {concurrent:.3f}s")
+    print(f"speed-up:   {serial / concurrent:.2f}x")
+
+
+if __name__ == "__main__":
+    main()